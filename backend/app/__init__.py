@@ -1,9 +1,13 @@
+import os
+
 from flask import Flask, jsonify
 from flask_login import LoginManager
 from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.routing import UUIDConverter
 from flask_mail import Message
 
 from .extensions import db, migrate, mail  # ← importe mail ici
+from . import mail_sink, json_provider
 from .routes_auth import bp_auth
 from .routes_admin import bp_admin, bp_admin_orders, bp_orders
 from .routes_memberships import bp_mem
@@ -11,31 +15,53 @@ from .routes_pins import bp_pins
 from .routes_pins_request import bp_requests
 from .categories import bp_categories
 from .pennes import bp_admin_penne, bp_user_penne
+from .scan_log import scan_log
+from .ratelimit import limiter
+from .mail_outbox import outbox
+from .mailings import bp_mailings
+from .analytics import bp_analytics
+from .seed import bp_seed
+from .metrics import metrics
+from .sql_profiler import sql_profiler
+from .compression import compression
+from .invalidation import bus
+from .pin_stream import bp_pin_stream, broadcaster
+from .cart import bp_cart
 
-def create_app():
-    app = Flask(__name__)
-    app.config["SQLALCHEMY_DATABASE_URI"] = "postgresql://postgres:postgres@db:5432/membres"
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    app.config["SECRET_KEY"] = "changeme"
-    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"pool_pre_ping": True}
-    app.config["SESSION_COOKIE_SAMESITE"] = "Lax"
-    app.config["SESSION_COOKIE_SECURE"] = True
-    app.config["SESSION_COOKIE_HTTPONLY"] = True
-    
+class UUIDStrConverter(UUIDConverter):
+    """<uuid:...> valide le format mais passe une str aux vues (ids str côté modèles)."""
+
+    def to_python(self, value):
+        return str(super().to_python(value))
+
+
+def create_app(overrides=None, profile=None):
+    """`profile` : production / development / test (défaut : APP_PROFILE).
+    `overrides` : valeurs qui remplacent la configuration (benchmarks, scripts)."""
     from . import config
-    
-    app.config.update(
-        MAIL_SERVER="smtp.gmail.com",
-        MAIL_PORT=587,
-        MAIL_USE_TLS=True,
-        MAIL_USERNAME=config.MAIL_ADDRESS,
-        MAIL_PASSWORD=config.MAIL_PASSWORD,
-        MAIL_DEFAULT_SENDER=config.MAIL_ADDRESS
-    )
 
+    if (profile or os.environ.get("APP_PROFILE")) != "test":
+        config.load_env_file()
+
+    app = Flask(__name__)
+    app.config.update(config.load(profile, overrides))
+
+    os.makedirs(app.config["DATA_DIR"], exist_ok=True)
+    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+
+    json_provider.init_app(app)
     db.init_app(app)
+    bus.init_app(app)
     migrate.init_app(app, db)
     mail.init_app(app)  # ← initialise mail ici
+    mail_sink.init_app(app)
+    scan_log.init_app(app)
+    limiter.init_app(app)
+    outbox.init_app(app)
+    metrics.init_app(app)
+    sql_profiler.init_app(app)
+    compression.init_app(app)
+    broadcaster.init_app(app)
 
     login_manager = LoginManager()
     login_manager.init_app(app)
@@ -44,14 +70,16 @@ def create_app():
     def unauthorized():
         return jsonify({"error": "unauthorized"}), 401
 
-    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+    # x_for : IP réelle du client (nginx), nécessaire pour la limitation de débit
+    app.url_map.converters["uuid"] = UUIDStrConverter
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)
 
     # lazy import après db
-    from .models import User
+    from .user_cache import load_session_user
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(user_id)
+        return load_session_user(user_id)
 
     @app.get("/api/health")
     def health():
@@ -60,10 +88,9 @@ def create_app():
     @app.route("/api/test-mail")
     def test_mail():
         try:
-            from . import config
             msg = Message(
                 "Test mail",
-                recipients=[config.MAIL_TEST],  # mets ton vrai email ici
+                recipients=[app.config["MAIL_TEST"]],  # MAIL_TEST dans .env
                 body="Si tu reçois ce mail, Flask-Mail fonctionne."
             )
             mail.send(msg)
@@ -75,11 +102,16 @@ def create_app():
     app.register_blueprint(bp_admin)
     app.register_blueprint(bp_mem)
     app.register_blueprint(bp_pins)
+    app.register_blueprint(bp_pin_stream)
+    app.register_blueprint(bp_cart)
     app.register_blueprint(bp_admin_orders)
     app.register_blueprint(bp_orders)
     app.register_blueprint(bp_requests)
     app.register_blueprint(bp_categories)
     app.register_blueprint(bp_admin_penne)
     app.register_blueprint(bp_user_penne)
+    app.register_blueprint(bp_mailings)
+    app.register_blueprint(bp_analytics)
+    app.register_blueprint(bp_seed)
 
     return app
@@ -0,0 +1,216 @@
+# app/analytics.py
+"""Statistiques de ventes servies depuis des tables d'agrégats.
+
+sales_rollup (jour, statut, pin) et order_rollup (jour, statut) sont tenues
+à jour dans la même transaction que chaque changement de commande
+(création, modification, changement de statut, suppression) : `apply_order`
+retire l'ancienne contribution d'une commande et ajoute la nouvelle. Le
+tableau de bord lit donc quelques lignes indexées au lieu de parcourir
+toutes les commandes. `flask analytics rebuild` recalcule tout.
+"""
+from collections import defaultdict
+from datetime import date, datetime
+
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import selectinload
+
+from .extensions import db, upsert_insert
+from .models import Role, Order, SalesRollup, OrderRollup
+
+bp_analytics = Blueprint("analytics", __name__, url_prefix="/api/admin/analytics")
+
+# statuts qui ne comptent pas dans le chiffre d'affaires
+EXCLUDED_STATUSES = {"annulée"}
+
+
+# ---------- Maintenance incrémentale ----------
+def order_contribution(order, status=None):
+    """Deltas (ventes par pin, total commande) d'une commande pour un statut donné."""
+    status = status or order.status or "en attente"
+    day = (order.created_at or datetime.utcnow()).date()
+    per_pin = defaultdict(lambda: [0, 0.0])
+    total = 0.0
+    for item in order.items:
+        quantity = item.quantity or 0
+        per_pin[str(item.pin_id)][0] += quantity
+        per_pin[str(item.pin_id)][1] += quantity * (item.price or 0)
+        total += quantity * (item.price or 0)
+    return day, status, per_pin, total
+
+
+def apply_order(contribution, sign=1):
+    """Ajoute (sign=1) ou retire (sign=-1) la contribution d'une commande aux agrégats."""
+    apply_orders([contribution], sign)
+
+
+def apply_orders(contributions, sign=1):
+    """Comme apply_order pour plusieurs commandes : deux UPSERT au total."""
+    sales = defaultdict(lambda: [0, 0.0])
+    orders = defaultdict(lambda: [0, 0.0])
+    for day, status, per_pin, total in contributions:
+        for pin_id, (units, revenue) in per_pin.items():
+            sales[(day, status, pin_id)][0] += sign * units
+            sales[(day, status, pin_id)][1] += sign * revenue
+        orders[(day, status)][0] += sign
+        orders[(day, status)][1] += sign * total
+
+    if sales:
+        table = SalesRollup.__table__
+        stmt = upsert_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.status, table.c.pin_id],
+            set_={
+                "units": table.c.units + stmt.excluded.units,
+                "revenue": table.c.revenue + stmt.excluded.revenue,
+            },
+        )
+        db.session.execute(stmt, [
+            {"day": d, "status": s, "pin_id": p, "units": u, "revenue": r}
+            for (d, s, p), (u, r) in sales.items()
+        ])
+
+    if not orders:
+        return
+    table = OrderRollup.__table__
+    stmt = upsert_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.day, table.c.status],
+        set_={
+            "orders": table.c.orders + stmt.excluded.orders,
+            "revenue": table.c.revenue + stmt.excluded.revenue,
+        },
+    )
+    db.session.execute(stmt, [
+        {"day": d, "status": s, "orders": n, "revenue": r}
+        for (d, s), (n, r) in orders.items()
+    ])
+
+
+def rebuild():
+    """Recalcule entièrement les agrégats depuis order / order_item."""
+    db.session.execute(delete(SalesRollup))
+    db.session.execute(delete(OrderRollup))
+
+    sales = defaultdict(lambda: [0, 0.0])
+    orders = defaultdict(lambda: [0, 0.0])
+    query = select(Order).options(selectinload(Order.items)).execution_options(yield_per=1000)
+    for order in db.session.scalars(query):
+        day, status, per_pin, total = order_contribution(order)
+        for pin_id, (units, revenue) in per_pin.items():
+            sales[(day, status, pin_id)][0] += units
+            sales[(day, status, pin_id)][1] += revenue
+        orders[(day, status)][0] += 1
+        orders[(day, status)][1] += total
+
+    if sales:
+        db.session.execute(insert(SalesRollup), [
+            {"day": d, "status": s, "pin_id": p, "units": u, "revenue": r}
+            for (d, s, p), (u, r) in sales.items()
+        ])
+    if orders:
+        db.session.execute(insert(OrderRollup), [
+            {"day": d, "status": s, "orders": n, "revenue": r}
+            for (d, s), (n, r) in orders.items()
+        ])
+    db.session.commit()
+    return len(orders)
+
+
+@bp_analytics.cli.command("rebuild")
+def rebuild_command():
+    """Recalcule les tables d'agrégats de ventes."""
+    rebuild()
+    print("Agrégats de ventes recalculés.")
+
+
+# ---------- API ----------
+@bp_analytics.before_request
+@login_required
+def require_admin():
+    if getattr(current_user, "role", None) != Role.ADMIN:
+        return jsonify({"error": "Forbidden"}), 403
+
+
+def _date_filters(model):
+    filters = []
+    try:
+        if request.args.get("from"):
+            filters.append(model.day >= date.fromisoformat(request.args["from"]))
+        if request.args.get("to"):
+            filters.append(model.day <= date.fromisoformat(request.args["to"]))
+    except ValueError:
+        return None
+    return filters
+
+
+@bp_analytics.get("/")
+def sales_analytics():
+    """CA par jour et par catégorie, top pins, unités par statut, panier moyen (?from=, ?to=)."""
+    from .routes_admin import read_pins
+
+    sales_filters = _date_filters(SalesRollup)
+    order_filters = _date_filters(OrderRollup)
+    if sales_filters is None or order_filters is None:
+        return jsonify({"error": "Date invalide (format AAAA-MM-JJ attendu)"}), 400
+    counted = OrderRollup.status.notin_(EXCLUDED_STATUSES)
+
+    per_day = (
+        db.session.query(OrderRollup.day, db.func.sum(OrderRollup.orders), db.func.sum(OrderRollup.revenue))
+        .filter(counted, *order_filters)
+        .group_by(OrderRollup.day)
+        .having(db.func.sum(OrderRollup.orders) != 0)
+        .order_by(OrderRollup.day)
+        .all()
+    )
+    per_pin = (
+        db.session.query(SalesRollup.pin_id, db.func.sum(SalesRollup.units), db.func.sum(SalesRollup.revenue))
+        .filter(SalesRollup.status.notin_(EXCLUDED_STATUSES), *sales_filters)
+        .group_by(SalesRollup.pin_id)
+        .having(db.func.sum(SalesRollup.units) != 0)
+        .all()
+    )
+    per_status = (
+        db.session.query(SalesRollup.status, db.func.sum(SalesRollup.units))
+        .filter(*sales_filters)
+        .group_by(SalesRollup.status)
+        .having(db.func.sum(SalesRollup.units) != 0)
+        .all()
+    )
+
+    # (les lignes retombées à zéro après annulation/suppression sont ignorées)
+    # la catégorie vient du catalogue actuel (une réaffectation s'applique à l'historique)
+    pin_map = {str(p.get("id")): p for p in read_pins()}
+    per_category = defaultdict(lambda: {"units": 0, "revenue": 0.0})
+    for pin_id, units, revenue in per_pin:
+        category = (pin_map.get(pin_id) or {}).get("category") or "Autre"
+        per_category[category]["units"] += units or 0
+        per_category[category]["revenue"] += revenue or 0
+
+    top = sorted(per_pin, key=lambda r: (r[1] or 0, r[2] or 0), reverse=True)[:request.args.get("top", 10, type=int)]
+    total_orders = sum(n or 0 for _, n, _ in per_day)
+    total_revenue = sum(r or 0 for _, _, r in per_day)
+
+    return jsonify({
+        "revenue_per_day": [
+            {"day": d.isoformat(), "orders": n, "revenue": round(r or 0, 2)} for d, n, r in per_day
+        ],
+        "revenue_per_category": [
+            {"category": c, "units": v["units"], "revenue": round(v["revenue"], 2)}
+            for c, v in sorted(per_category.items(), key=lambda kv: kv[1]["revenue"], reverse=True)
+        ],
+        "top_pins": [
+            {
+                "pin_id": pin_id,
+                "title": (pin_map.get(pin_id) or {}).get("title"),
+                "units": units,
+                "revenue": round(revenue or 0, 2),
+            }
+            for pin_id, units, revenue in top
+        ],
+        "units_per_status": {status: units for status, units in per_status},
+        "orders": total_orders,
+        "revenue": round(total_revenue, 2),
+        "average_basket": round(total_revenue / total_orders, 2) if total_orders else 0,
+    })
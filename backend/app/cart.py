@@ -0,0 +1,106 @@
+# app/cart.py
+"""Validation du panier contre le catalogue : POST /api/cart/validate.
+
+Toutes les lignes sont vérifiées en une lecture du catalogue et tous les
+problèmes sont renvoyés ensemble :
+  - invalid            : id / quantité / prix illisibles
+  - not_found          : pin absent du catalogue
+  - insufficient_stock : quantité demandée > stock (`available`, `requested`)
+  - price_changed      : prix envoyé par le client ≠ prix du catalogue
+                         (`price` reçu, `expected` actuel)
+Les lignes d'un même pin sont regroupées. Les prix renvoyés dans `items` sont
+ceux du catalogue : create_order (routes_admin.py) passe par le même
+validateur et n'utilise jamais le prix envoyé par le client.
+"""
+from flask import Blueprint, jsonify, request
+
+from .routes_pins import read_pins
+
+bp_cart = Blueprint("cart", __name__)
+
+
+def _canonical_price(pin):
+    try:
+        return round(float(str(pin.get("price")).replace(",", ".")), 2)
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_cart(items, pins=None):
+    """Vérifie les lignes `items` ([{id, quantity, price?}]) contre le catalogue.
+
+    Retourne {"ok", "items", "problems", "total"} : `items` contient les
+    lignes valides au prix du catalogue, `problems` chaque erreur avec
+    l'index de la (première) ligne concernée.
+    """
+    if pins is None:
+        pins = read_pins()
+    pin_map = {p.get("id"): p for p in pins}
+
+    problems = []
+    lines = {}  # pin_id -> ligne canonique, dans l'ordre du panier
+    for index, it in enumerate(items if isinstance(items, list) else []):
+        try:
+            pin_id = int(it.get("id"))
+            quantity = int(it.get("quantity", 1))
+            price = it.get("price")
+            price = None if price is None else round(float(price), 2)
+        except (AttributeError, TypeError, ValueError):
+            problems.append({"index": index, "code": "invalid", "message": "Article invalide"})
+            continue
+        if quantity <= 0:
+            problems.append({"index": index, "id": pin_id, "code": "invalid", "message": "Quantité invalide"})
+            continue
+
+        pin = pin_map.get(pin_id)
+        if not pin:
+            problems.append({
+                "index": index, "id": pin_id, "code": "not_found",
+                "message": f"Article introuvable (id {pin_id})",
+            })
+            continue
+        title = pin.get("title") or "cet article"
+        expected = _canonical_price(pin)
+        if expected is None:
+            problems.append({"index": index, "id": pin_id, "code": "invalid", "message": f"Prix invalide pour {title}"})
+            continue
+        if price is not None and price != expected:
+            problems.append({
+                "index": index, "id": pin_id, "code": "price_changed",
+                "message": f"Le prix de {title} a changé ({expected:.2f} €)",
+                "price": price, "expected": expected,
+            })
+
+        line = lines.get(pin_id)
+        if line is None:
+            line = lines[pin_id] = {
+                "index": index, "id": pin_id, "title": pin.get("title", ""),
+                "price": expected, "quantity": 0, "stock": int(pin.get("stock", 0)),
+            }
+        line["quantity"] += quantity
+
+    for line in lines.values():
+        if line["quantity"] > line["stock"]:
+            problems.append({
+                "index": line["index"], "id": line["id"], "code": "insufficient_stock",
+                "message": f"Stock insuffisant pour {line['title'] or 'cet article'}",
+                "available": line["stock"], "requested": line["quantity"],
+            })
+
+    problems.sort(key=lambda p: p["index"])
+    canonical = [{k: v for k, v in line.items() if k != "index"} for line in lines.values()]
+    return {
+        "ok": not problems,
+        "items": canonical,
+        "problems": problems,
+        "total": round(sum(line["price"] * line["quantity"] for line in canonical), 2),
+    }
+
+
+@bp_cart.post("/api/cart/validate")
+def validate():
+    data = request.get_json(silent=True) or {}
+    items = data.get("items")
+    if not isinstance(items, list):
+        return jsonify({"error": "items doit être une liste"}), 400
+    return jsonify(validate_cart(items))
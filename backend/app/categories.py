@@ -1,19 +1,21 @@
 from flask import Blueprint, request, jsonify
 import os, json
 
-from .routes_pins import read_pins, save_pins  # Pour pouvoir mettre à jour les pins si catégorie supprimée
+from .json_store import read_json, write_json, data_path, file_version, locked
+from .compression import compression
+from .http_cache import conditional
+from .invalidation import bus
+
+from .routes_pins import DATA_FILE as PINS_FILE, read_pins, save_pins  # Pour pouvoir mettre à jour les pins si catégorie supprimée
 
 CATEGORIES_FILE = "categories.json"
 
 def read_categories():
-    if not os.path.exists(CATEGORIES_FILE):
-        return []
-    with open(CATEGORIES_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return read_json(data_path(CATEGORIES_FILE))
 
 def save_categories(categories):
-    with open(CATEGORIES_FILE, "w", encoding="utf-8") as f:
-        json.dump(categories, f, indent=2, ensure_ascii=False)
+    write_json(data_path(CATEGORIES_FILE), categories)
+    bus.publish("categories")
 
 def normalize_category(name: str) -> str:
     if not name:
@@ -24,6 +26,8 @@ def normalize_category(name: str) -> str:
 bp_categories = Blueprint("categories", __name__, url_prefix="/api/categories")
 
 @bp_categories.get("/")
+@conditional(lambda: file_version(data_path(CATEGORIES_FILE)))
+@compression.cached(lambda: file_version(data_path(CATEGORIES_FILE)), channel="categories")
 def get_categories():
     return jsonify(read_categories())
 
@@ -35,12 +39,13 @@ def add_category():
 
     name = normalize_category(name)  # 🔑 normalisation
 
-    categories = read_categories()
-    if name in categories:
-        return jsonify({"error": "Category already exists"}), 400
+    with locked(data_path(CATEGORIES_FILE)):
+        categories = read_categories()
+        if name in categories:
+            return jsonify({"error": "Category already exists"}), 400
 
-    categories.append(name)
-    save_categories(categories)
+        categories.append(name)
+        save_categories(categories)
     return jsonify({"success": True, "category": name}), 201
 
 
@@ -52,17 +57,19 @@ def delete_category(name):
     if name == "Autre":
         return jsonify({"error": "Cannot delete default category"}), 400
 
-    categories = read_categories()
-    if name not in categories:
-        return jsonify({"error": "Category not found"}), 404
-
-    # Réaffecter les pins existants à "Autre"
-    pins = read_pins()
-    for pin in pins:
-        if normalize_category(pin.get("category")) == name:
-            pin["category"] = "Autre"
-    save_pins(pins)
-
-    categories = [c for c in categories if c != name]
-    save_categories(categories)
+    # toujours catégories puis catalogue : pas d'interblocage avec add_category
+    with locked(data_path(CATEGORIES_FILE)), locked(data_path(PINS_FILE)):
+        categories = read_categories()
+        if name not in categories:
+            return jsonify({"error": "Category not found"}), 404
+
+        # Réaffecter les pins existants à "Autre"
+        pins = read_pins()
+        for pin in pins:
+            if normalize_category(pin.get("category")) == name:
+                pin["category"] = "Autre"
+        save_pins(pins)
+
+        categories = [c for c in categories if c != name]
+        save_categories(categories)
     return jsonify({"success": True, "deleted": name})
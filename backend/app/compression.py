@@ -0,0 +1,141 @@
+# app/compression.py
+"""Compression des réponses négociée sur Accept-Encoding (brotli, gzip).
+
+  - toute réponse compressible (JSON, texte, SVG…) d'au moins
+    COMPRESS_MIN_SIZE octets est compressée à la volée (niveau modéré)
+  - les vues décorées par `compression.cached(version)` (catalogue,
+    catégories) gardent en mémoire le corps et ses variantes compressées au
+    niveau maximal, calculées une seule fois par `version()` : tant que la
+    version ne change pas, ni lecture du fichier, ni sérialisation, ni
+    compression. Avec `channel`, l'entrée est aussi libérée par le bus
+    d'invalidation (app/invalidation.py) dès qu'un worker publie sur ce canal
+
+brotli est optionnel : sans lui seul gzip est proposé. nginx ne compresse
+pas les réponses de /api/ : c'est fait ici.
+"""
+import gzip
+import threading
+from functools import wraps
+
+from flask import current_app, request
+
+from .invalidation import bus
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+}
+
+
+def _compress(data, encoding, best=False):
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if best else 5)
+    return gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
+
+
+def _compressible(mimetype):
+    return mimetype in COMPRESSIBLE_TYPES or (mimetype or "").startswith("text/")
+
+
+class CachedBody:
+    def __init__(self, version, data, mimetype):
+        self.version = version
+        self.data = data
+        self.mimetype = mimetype
+        self.variants = {}
+
+    def encoded(self, encoding):
+        if encoding is None:
+            return self.data
+        if encoding not in self.variants:
+            self.variants[encoding] = _compress(self.data, encoding, best=True)
+        return self.variants[encoding]
+
+
+class Compression:
+    def __init__(self):
+        self.encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+        self._caches = []  # un dict par vue décorée
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        if app.config.get("COMPRESS_ENABLED", True):
+            app.after_request(self._after_request)
+
+    def negotiate(self):
+        """Meilleur encodage accepté par le client (None : pas de compression)."""
+        if not current_app.config.get("COMPRESS_ENABLED", True):
+            return None
+        return request.accept_encodings.best_match(self.encodings)
+
+    # ---------- À la volée ----------
+    def _after_request(self, response):
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or not _compressible(response.mimetype)
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        data = response.get_data()
+        if len(data) < current_app.config["COMPRESS_MIN_SIZE"]:
+            return response
+        encoding = self.negotiate()
+        if encoding is None:
+            return response
+        response.set_data(_compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    # ---------- Réponses mises en cache ----------
+    def cached(self, version, channel=None):
+        """Met en cache la réponse 200 de la vue et ses variantes compressées.
+
+        `version()` identifie l'état des données (ex: json_store.file_version) ;
+        le cache est recalculé dès qu'elle change. `channel` : canal du bus
+        d'invalidation qui vide ce cache.
+        """
+        def decorator(view):
+            cache = {}
+            self._caches.append(cache)
+            if channel:
+                bus.subscribe(channel, lambda key: cache.clear())
+
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = tuple(sorted(kwargs.items()))
+                current = version()
+                entry = cache.get(key)
+                if entry is None or entry.version != current:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    entry = CachedBody(current, response.get_data(), response.mimetype)
+                    with self._lock:
+                        cache[key] = entry
+
+                encoding = self.negotiate() if len(entry.data) >= current_app.config["COMPRESS_MIN_SIZE"] else None
+                response = current_app.response_class(entry.encoded(encoding), mimetype=entry.mimetype)
+                if encoding:
+                    response.headers["Content-Encoding"] = encoding
+                response.vary.add("Accept-Encoding")
+                return response
+            return wrapper
+        return decorator
+
+    def clear(self):
+        with self._lock:
+            for cache in self._caches:
+                cache.clear()
+
+
+compression = Compression()
@@ -1,9 +1,268 @@
 # app/config.py
+"""Configuration en couches : défauts -> profil -> variables d'environnement -> overrides.
+
+Le profil est choisi par APP_PROFILE (ou `create_app(profile=...)`) :
+  - production  : PostgreSQL du docker-compose, SMTP Gmail
+  - development : idem, cookies non sécurisés (http://localhost)
+  - test        : base SQLite, fichiers JSON, uploads et mails dans un
+                  dossier temporaire ; démarre sans aucun service (tests,
+                  benchmarks)
+Chaque clé de ENV_VARS peut ensuite être remplacée par la variable
+d'environnement du même nom (DATABASE_URL pour SQLALCHEMY_DATABASE_URI).
+Le fichier .env est lu par create_app(), sauf pour le profil test.
+"""
+import atexit
 import os
-from dotenv import load_dotenv
+import shutil
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+class BaseConfig:
+    SECRET_KEY = "changeme"
+    SESSION_COOKIE_SAMESITE = "Lax"
+    SESSION_COOKIE_SECURE = True
+    SESSION_COOKIE_HTTPONLY = True
+
+    # base de données + pool (par worker)
+    SQLALCHEMY_DATABASE_URI = "postgresql://postgres:postgres@db:5432/membres"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DB_POOL_SIZE = 5
+    DB_MAX_OVERFLOW = 10
+    DB_POOL_RECYCLE = 1800        # secondes
+    DB_POOL_TIMEOUT = 30          # secondes d'attente d'une connexion libre
+    DB_STATEMENT_TIMEOUT = 0      # millisecondes (PostgreSQL), 0 = aucune limite
+
+    # fichiers JSON (pins, catégories, demandes) et images envoyées
+    DATA_DIR = BACKEND_DIR
+    UPLOAD_FOLDER = "/app/frontend/public/uploads"
+
+    # mails : "smtp" ou "file" (un .eml par message dans MAIL_FILE_DIR)
+    MAIL_BACKEND = "smtp"
+    MAIL_FILE_DIR = os.path.join(tempfile.gettempdir(), "cap-mails")
+    MAIL_SERVER = "smtp.gmail.com"
+    MAIL_PORT = 587
+    MAIL_USE_TLS = True
+    MAIL_ADDRESS = None
+    MAIL_PASSWORD = None
+    MAIL_TEST = None
+
+    # hachage des mots de passe (format werkzeug, ex: "scrypt:16384:8:1")
+    PASSWORD_HASH_METHOD = "scrypt"
+    PASSWORD_HASH_WORKERS = 2     # 0 : hachage dans le thread de la requête (workers sync)
+    PASSWORD_HASH_TIMEOUT = None  # secondes d'attente d'un hachage, None = illimité
+
+    # limitation de débit sur l'auth : "memory" (process) ou "database" (partagé entre workers)
+    RATELIMIT_BACKEND = "database"
+    RATELIMIT_ENABLED = True
+
+    # envois groupés : messages/s au total, tous workers confondus via le seau du
+    # limiteur (par process avec RATELIMIT_BACKEND=memory ; 0 = pas de limite)
+    # et messages par connexion SMTP
+    MAIL_SEND_RATE = 5.0
+    MAIL_OUTBOX_BATCH_SIZE = 50
+    MAIL_OUTBOX_POLL_INTERVAL = 10.0   # secondes entre deux passages de l'outbox
+    MAIL_OUTBOX_MAX_ATTEMPTS = 6
+    MAIL_OUTBOX_BACKOFF = 30.0         # secondes, doublé à chaque échec
+
+    # journal des scans de /api/verify (app/scan_log.py)
+    SCAN_LOG_BATCH_SIZE = 200
+    SCAN_LOG_FLUSH_INTERVAL = 5.0      # secondes
+    SCAN_LOG_MAX_PENDING = 10000       # entrées en mémoire avant abandon des plus anciennes
+
+    # cache de l'utilisateur de session (secondes, 0 = désactivé)
+    USER_CACHE_TTL = 30.0
+    USER_CACHE_MAX = 10000
+
+    # processus de rendu des planches QR (None : nombre de CPU)
+    QR_SHEET_WORKERS = None
+
+    # /metrics Prometheus (nécessite prometheus_client)
+    METRICS_ENABLED = True
+
+    # bus d'invalidation des caches entre workers (app/invalidation.py)
+    INVALIDATION_ENABLED = True
+    INVALIDATION_POLL_INTERVAL = 1.0   # secondes (bases sans LISTEN/NOTIFY)
+    INVALIDATION_RETENTION = 300.0     # secondes de rétention des événements
+
+    # flux SSE /api/pins/stream (app/pin_stream.py)
+    SSE_HEARTBEAT = 15.0          # secondes entre deux `: ping`
+    SSE_QUEUE_SIZE = 100          # événements en attente par client avant reset
+
+    # JSON : "auto" (orjson si installé), "orjson" ou "stdlib"
+    JSON_PROVIDER = "auto"
+
+    # compression gzip / brotli des réponses (app/compression.py)
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 1024      # octets
+
+    # profilage SQL par requête + détection des N+1 (app/sql_profiler.py)
+    SQL_PROFILE = False
+    SQL_PROFILE_REPEAT_THRESHOLD = 5
+
+
+class DevelopmentConfig(BaseConfig):
+    SESSION_COOKIE_SECURE = False
+
+
+class TestConfig(BaseConfig):
+    TESTING = True
+    SESSION_COOKIE_SECURE = False
+    # fichier SQLite dans le dossier temporaire (voir load) : pas de base en
+    # mémoire, dont l'unique connexion serait partagée avec les threads de fond
+    # (outbox, journal des scans, diffusion du stock)
+    SQLALCHEMY_DATABASE_URI = None
+    INVALIDATION_ENABLED = False  # un seul process
+    MAIL_BACKEND = "file"
+    MAIL_ADDRESS = "test@example.com"
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
+    RATELIMIT_BACKEND = "memory"
+    METRICS_ENABLED = False
+
+    # dossier temporaire propre à chaque process de test
+    DATA_DIR = None
+    UPLOAD_FOLDER = None
+    MAIL_FILE_DIR = None
+
+
+PROFILES = {
+    "production": BaseConfig,
+    "development": DevelopmentConfig,
+    "test": TestConfig,
+}
+
+# variable d'environnement -> (clé de config, type)
+ENV_VARS = {
+    "SECRET_KEY": ("SECRET_KEY", str),
+    "DATABASE_URL": ("SQLALCHEMY_DATABASE_URI", str),
+    "DB_POOL_SIZE": ("DB_POOL_SIZE", int),
+    "DB_MAX_OVERFLOW": ("DB_MAX_OVERFLOW", int),
+    "DB_POOL_RECYCLE": ("DB_POOL_RECYCLE", int),
+    "DB_POOL_TIMEOUT": ("DB_POOL_TIMEOUT", float),
+    "DB_STATEMENT_TIMEOUT": ("DB_STATEMENT_TIMEOUT", int),
+    "SESSION_COOKIE_SECURE": ("SESSION_COOKIE_SECURE", bool),
+    "DATA_DIR": ("DATA_DIR", str),
+    "UPLOAD_FOLDER": ("UPLOAD_FOLDER", str),
+    "MAIL_BACKEND": ("MAIL_BACKEND", str),
+    "MAIL_FILE_DIR": ("MAIL_FILE_DIR", str),
+    "MAIL_SERVER": ("MAIL_SERVER", str),
+    "MAIL_PORT": ("MAIL_PORT", int),
+    "MAIL_ADDRESS": ("MAIL_ADDRESS", str),
+    "MAIL_PASSWORD": ("MAIL_PASSWORD", str),
+    "MAIL_TEST": ("MAIL_TEST", str),
+    "PASSWORD_HASH_METHOD": ("PASSWORD_HASH_METHOD", str),
+    "PASSWORD_HASH_WORKERS": ("PASSWORD_HASH_WORKERS", int),
+    "PASSWORD_HASH_TIMEOUT": ("PASSWORD_HASH_TIMEOUT", float),
+    "RATELIMIT_BACKEND": ("RATELIMIT_BACKEND", str),
+    "RATELIMIT_ENABLED": ("RATELIMIT_ENABLED", bool),
+    "MAIL_SEND_RATE": ("MAIL_SEND_RATE", float),
+    "MAIL_OUTBOX_BATCH_SIZE": ("MAIL_OUTBOX_BATCH_SIZE", int),
+    "MAIL_OUTBOX_POLL_INTERVAL": ("MAIL_OUTBOX_POLL_INTERVAL", float),
+    "MAIL_OUTBOX_MAX_ATTEMPTS": ("MAIL_OUTBOX_MAX_ATTEMPTS", int),
+    "MAIL_OUTBOX_BACKOFF": ("MAIL_OUTBOX_BACKOFF", float),
+    "SCAN_LOG_BATCH_SIZE": ("SCAN_LOG_BATCH_SIZE", int),
+    "SCAN_LOG_FLUSH_INTERVAL": ("SCAN_LOG_FLUSH_INTERVAL", float),
+    "SCAN_LOG_MAX_PENDING": ("SCAN_LOG_MAX_PENDING", int),
+    "USER_CACHE_TTL": ("USER_CACHE_TTL", float),
+    "USER_CACHE_MAX": ("USER_CACHE_MAX", int),
+    "QR_SHEET_WORKERS": ("QR_SHEET_WORKERS", int),
+    "METRICS_ENABLED": ("METRICS_ENABLED", bool),
+    "INVALIDATION_ENABLED": ("INVALIDATION_ENABLED", bool),
+    "INVALIDATION_POLL_INTERVAL": ("INVALIDATION_POLL_INTERVAL", float),
+    "INVALIDATION_RETENTION": ("INVALIDATION_RETENTION", float),
+    "SSE_HEARTBEAT": ("SSE_HEARTBEAT", float),
+    "SSE_QUEUE_SIZE": ("SSE_QUEUE_SIZE", int),
+    "JSON_PROVIDER": ("JSON_PROVIDER", str),
+    "COMPRESS_ENABLED": ("COMPRESS_ENABLED", bool),
+    "COMPRESS_MIN_SIZE": ("COMPRESS_MIN_SIZE", int),
+    "SQL_PROFILE": ("SQL_PROFILE", bool),
+    "SQL_PROFILE_REPEAT_THRESHOLD": ("SQL_PROFILE_REPEAT_THRESHOLD", int),
+}
+
+
+def load_env_file():
+    """Variables du fichier .env (développement hors docker-compose) ; les
+    variables déjà définies gardent la priorité."""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
+def _cast(value, kind):
+    if kind is bool:
+        return value.strip().lower() not in ("0", "false", "no", "off", "")
+    return kind(value)
+
+
+def load(profile=None, overrides=None, environ=os.environ):
+    """Configuration finale (dict) pour app.config."""
+    profile = profile or environ.get("APP_PROFILE", "production")
+    if profile not in PROFILES:
+        raise ValueError(f"APP_PROFILE inconnu: {profile}")
+
+    cls = PROFILES[profile]
+    values = {key: getattr(cls, key) for key in dir(cls) if key.isupper()}
+    values["APP_PROFILE"] = profile
+    for name, (key, kind) in ENV_VARS.items():
+        if environ.get(name) is not None:
+            values[key] = _cast(environ[name], kind)
+    values.update(overrides or {})
+
+    if profile == "test":
+        tmp = None
+        for key, sub in (("DATA_DIR", "data"), ("UPLOAD_FOLDER", "uploads"), ("MAIL_FILE_DIR", "mails")):
+            if not values.get(key):
+                tmp = tmp or tempfile.mkdtemp(dir=_test_root())
+                values[key] = os.path.join(tmp, sub)
+        if not values.get("SQLALCHEMY_DATABASE_URI"):
+            tmp = tmp or tempfile.mkdtemp(dir=_test_root())
+            values["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(tmp, "test.db")
+
+    # Flask-Mail
+    values.setdefault("MAIL_USERNAME", values["MAIL_ADDRESS"])
+    values.setdefault("MAIL_DEFAULT_SENDER", values["MAIL_ADDRESS"])
+    if values["MAIL_BACKEND"] == "file":
+        values["MAIL_SUPPRESS_SEND"] = True
+
+    values.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(values))
+    return values
+
+
+_test_root_dir = None
+
+
+def _test_root():
+    """Dossier temporaire du process (un sous-dossier par app de test),
+    supprimé à la sortie du process qui l'a créé."""
+    global _test_root_dir
+    if _test_root_dir is None:
+        _test_root_dir = tempfile.mkdtemp(prefix="cap-test-")
+        atexit.register(_remove_test_root, _test_root_dir, os.getpid())
+    return _test_root_dir
+
+
+def _remove_test_root(path, pid):
+    if os.getpid() == pid:  # pas dans un enfant forké (workers, pool de processus)
+        shutil.rmtree(path, ignore_errors=True)
+
 
-load_dotenv()
+def engine_options(values):
+    """Options de create_engine déduites de l'URL et des réglages DB_*."""
+    url = values["SQLALCHEMY_DATABASE_URI"]
+    if url.startswith("sqlite"):
+        if url in ("sqlite://", "sqlite:///:memory:"):
+            # une seule connexion partagée : la base en mémoire vit avec elle
+            from sqlalchemy.pool import StaticPool
+            return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+        return {"connect_args": {"check_same_thread": False}}
 
-MAIL_ADDRESS = os.getenv("MAIL_ADDRESS")
-MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
-MAIL_TEST = os.getenv("MAIL_TEST")
+    options = {
+        "pool_pre_ping": True,
+        "pool_size": values["DB_POOL_SIZE"],
+        "max_overflow": values["DB_MAX_OVERFLOW"],
+        "pool_recycle": values["DB_POOL_RECYCLE"],
+        "pool_timeout": values["DB_POOL_TIMEOUT"],
+    }
+    if values["DB_STATEMENT_TIMEOUT"] and url.startswith("postgresql"):
+        options["connect_args"] = {"options": f"-c statement_timeout={int(values['DB_STATEMENT_TIMEOUT'])}"}
+    return options
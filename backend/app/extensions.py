@@ -1,8 +1,97 @@
 # app/extensions.py
+import os
+import threading
+
+import click
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_mail import Mail
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+class LazyMigrate:
+    """Flask-Migrate chargé à la demande : alembic (~150 ms d'import) n'est
+    importé que par la commande `flask db`, pas à chaque démarrage de worker."""
+
+    def init_app(self, app, db):
+        self.db = db
+        app.cli.add_command(_MigrateCommands(self, name="db", help="Migrations de la base (Flask-Migrate)."))
+
+    def commands(self):
+        from flask_migrate import Migrate
+        from flask_migrate.cli import db as db_commands
+
+        app = current_app._get_current_object()
+        if "migrate" not in app.extensions:
+            Migrate(app, self.db)
+        return db_commands
+
+
+class _MigrateCommands(click.Command):
+    """`flask db ...` : les arguments sont transmis tels quels au groupe de
+    commandes de Flask-Migrate (options -d/-x et --help compris)."""
+
+    def __init__(self, migrate, **kwargs):
+        super().__init__(
+            add_help_option=False,
+            context_settings={"ignore_unknown_options": True, "allow_extra_args": True},
+            **kwargs,
+        )
+        self._migrate = migrate
+
+    def invoke(self, ctx):
+        return self._migrate.commands().main(args=ctx.args, prog_name=ctx.command_path, standalone_mode=False)
+
+
+class ForkSafeThread:
+    """Mixin : un thread de fond par process, démarré à la demande.
+
+    Après un fork (workers gunicorn avec preload), le thread du parent n'existe
+    plus dans l'enfant : ensure_started() en relance un au premier appel du
+    nouveau process. La sous-classe fournit `thread_name` et `_run()`, et peut
+    surcharger `_before_start()` (appelé sous verrou, avant le démarrage).
+    """
+
+    thread_name = "background"
+
+    def __init__(self):
+        self._thread = None
+        self._pid = None
+        self._thread_lock = threading.Lock()
+        # un verrou tenu par un autre thread au moment du fork resterait pris dans l'enfant
+        os.register_at_fork(after_in_child=self._reset_thread_lock)
+
+    def _reset_thread_lock(self):
+        self._thread_lock = threading.Lock()
+
+    def _thread_running(self):
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def ensure_started(self):
+        if self._thread_running():
+            return
+        with self._thread_lock:
+            if self._thread_running():
+                return
+            self._before_start()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+
+    def _before_start(self):
+        pass
+
+    def _run(self):
+        raise NotImplementedError
+
 
 db = SQLAlchemy()
-migrate = Migrate()
-mail = Mail()
\ No newline at end of file
+migrate = LazyMigrate()
+mail = Mail()
+
+
+def upsert_insert(table):
+    """INSERT supportant on_conflict_do_update (PostgreSQL en prod, SQLite en test)."""
+    if db.engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
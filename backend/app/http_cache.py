@@ -0,0 +1,64 @@
+# app/http_cache.py
+"""GET conditionnels : ETag et Cache-Control dérivés d'une version de ressource.
+
+    @bp_pins.get("/")
+    @conditional(lambda: file_version(data_path(DATA_FILE)))
+    def get_pins(): ...
+
+`version()` est appelée avant la vue : si l'ETag correspond à If-None-Match,
+un 304 sans corps est renvoyé sans exécuter la vue. Sources de version :
+  - fichier JSON : json_store.file_version (empreinte du contenu)
+  - compteur en base : versions.get_version (bump dans la transaction d'écriture)
+  - instantané déjà chargé (current_user)
+
+private=True : réponse propre à l'utilisateur connecté (ETag dépendant de
+l'utilisateur, Cache-Control: private, Vary: Cookie) ; sinon public,
+partageable par nginx et les caches intermédiaires. max_age=0 (défaut) :
+no-cache, le navigateur revalide à chaque navigation. Les ETags sont faibles
+(W/) : le corps compressé (app/compression.py) reste la même représentation.
+"""
+import hashlib
+from functools import wraps
+
+from flask import current_app, request
+from flask_login import current_user
+
+
+def _etag(version, private, kwargs):
+    user = current_user.get_id() if private else None
+    raw = repr((request.endpoint, sorted(kwargs.items()), user, version))
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def _set_headers(response, etag, private, max_age):
+    response.set_etag(etag, weak=True)
+    cc = response.cache_control
+    if private:
+        cc.private = True
+        response.vary.add("Cookie")
+    else:
+        cc.public = True
+    if max_age:
+        cc.max_age = max_age
+    else:
+        cc.no_cache = True
+    return response
+
+
+def conditional(version, private=False, max_age=0):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(*args, **kwargs)
+
+            etag = _etag(version(), private, kwargs)
+            if request.if_none_match.contains_weak(etag):
+                return _set_headers(current_app.response_class(status=304), etag, private, max_age)
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _set_headers(response, etag, private, max_age)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,170 @@
+# app/invalidation.py
+"""Bus d'invalidation des caches en mémoire entre workers (et entre machines).
+
+Un cache s'abonne à un canal nommé, les routes qui écrivent publient après
+le commit (ou après l'écriture du fichier JSON) :
+
+    bus.subscribe("users", lambda key: _cache.pop(key, None))
+    bus.publish("users", user_id)
+
+L'abonné du process qui publie est appelé immédiatement ; les autres
+reçoivent l'événement par
+  - PostgreSQL : NOTIFY sur le canal cache_<nom>, un thread LISTEN par
+    worker sur une connexion dédiée (hors pool)
+  - autres bases (SQLite) : table invalidation_event relue toutes les
+    INVALIDATION_POLL_INTERVAL secondes, lignes purgées après
+    INVALIDATION_RETENTION secondes
+Base SQLite en mémoire (profil test) : un seul process, livraison locale
+uniquement. key=None vide tout le cache abonné : c'est ce qui est envoyé
+quand la connexion LISTEN a été perdue (événements manqués). Les caches
+gardent leur TTL en filet de sécurité.
+"""
+import logging
+import os
+import select
+import socket
+import time
+import uuid
+
+from sqlalchemy import delete, func, insert
+
+from .extensions import ForkSafeThread, db
+from .models import InvalidationEvent
+
+logger = logging.getLogger(__name__)
+
+PG_CHANNEL_PREFIX = "cache_"
+
+
+class InvalidationBus(ForkSafeThread):
+    thread_name = "cache-invalidation"
+
+    def __init__(self):
+        super().__init__()
+        self.app = None
+        self.remote = False
+        self.poll_interval = 1.0
+        self.retention = 300.0
+        self._subscribers = {}
+        self._origin = None
+        self._origin_pid = None
+
+    def init_app(self, app):
+        self.app = app
+        self.poll_interval = float(app.config.get("INVALIDATION_POLL_INTERVAL", 1.0))
+        self.retention = float(app.config.get("INVALIDATION_RETENTION", 300.0))
+        url = app.config["SQLALCHEMY_DATABASE_URI"]
+        self.remote = app.config.get("INVALIDATION_ENABLED", True) and url not in ("sqlite://", "sqlite:///:memory:")
+        if self.remote:
+            app.before_request(self.ensure_started)
+
+    # ---------- Abonnés ----------
+    def subscribe(self, channel, callback):
+        """callback(key) ; key=None : tout invalider. À appeler avant le démarrage des workers."""
+        self._subscribers.setdefault(channel, []).append(callback)
+
+    def _deliver(self, channel, key):
+        for callback in self._subscribers.get(channel, ()):
+            try:
+                callback(key)
+            except Exception:
+                logger.exception("Invalidation callback failed (%s)", channel)
+
+    def _deliver_all(self):
+        for channel in self._subscribers:
+            self._deliver(channel, None)
+
+    # ---------- Publication ----------
+    @property
+    def origin(self):
+        # identifiant du process : ses propres événements ne lui reviennent pas
+        if self._origin_pid != os.getpid():
+            self._origin_pid = os.getpid()
+            self._origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        return self._origin
+
+    def publish(self, channel, key=None):
+        """Invalide `key` (None : tout) dans ce process puis dans tous les autres."""
+        self._deliver(channel, key)
+        if not self.remote:
+            return
+        key = "" if key is None else str(key)
+        try:
+            with self.app.app_context(), db.engine.connect() as conn:
+                if conn.dialect.name == "postgresql":
+                    conn.execute(func.pg_notify(PG_CHANNEL_PREFIX + channel, f"{self.origin} {key}").select())
+                else:
+                    conn.execute(insert(InvalidationEvent).values(
+                        channel=channel, key=key, origin=self.origin, created_at=time.time()))
+                conn.commit()
+        except Exception:
+            # les autres workers se rattrapent au TTL de leur cache
+            logger.exception("Invalidation publish failed (%s)", channel)
+
+    # ---------- Écoute ----------
+    def _run(self):
+        with self.app.app_context():
+            listen = self._listen if db.engine.dialect.name == "postgresql" else self._poll
+        first = True
+        while True:
+            try:
+                listen(first)
+            except Exception:
+                logger.exception("Invalidation listener failed, reconnecting")
+            first = False
+            time.sleep(min(self.poll_interval * 5, 5.0))
+
+    def _handle(self, channel, origin, key):
+        if origin != self.origin:
+            self._deliver(channel, key or None)
+
+    def _listen(self, first):
+        with self.app.app_context():
+            engine = db.engine
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        conn = engine.dialect.loaded_dbapi.connect(*cargs, **cparams)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                for channel in self._subscribers:
+                    cursor.execute(f'LISTEN "{PG_CHANNEL_PREFIX}{channel}"')
+            if not first:
+                self._deliver_all()  # NOTIFY perdus pendant la coupure
+            while True:
+                if select.select([conn], [], [], 30.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    origin, _, key = notify.payload.partition(" ")
+                    self._handle(notify.channel[len(PG_CHANNEL_PREFIX):], origin, key)
+        finally:
+            conn.close()
+
+    def _poll(self, first):
+        table = InvalidationEvent.__table__
+        with self.app.app_context():
+            with db.engine.connect() as conn:
+                last_id = conn.execute(func.max(table.c.id).select()).scalar() or 0
+        if not first:
+            self._deliver_all()
+        last_prune = 0.0
+        while True:
+            time.sleep(self.poll_interval)
+            with self.app.app_context():
+                with db.engine.connect() as conn:
+                    rows = conn.execute(
+                        table.select().where(table.c.id > last_id).order_by(table.c.id)
+                    ).all()
+                    now = time.time()
+                    if now - last_prune > self.retention:
+                        conn.execute(delete(table).where(table.c.created_at < now - self.retention))
+                        last_prune = now
+                    conn.commit()
+            for row in rows:
+                last_id = row.id
+                if row.channel in self._subscribers:
+                    self._handle(row.channel, row.origin, row.key)
+
+
+bus = InvalidationBus()
@@ -0,0 +1,56 @@
+# app/json_provider.py
+"""Sérialisation JSON de l'application : orjson si installé, sinon json (stdlib).
+
+orjson encode les grosses réponses (catalogue, membres, commandes) plusieurs
+fois plus vite. Le rendu reste celui du provider par défaut de Flask : dates
+au format HTTP, Decimal / UUID / dataclasses via `default`, clés triées,
+réponses indentées en debug. Ce qu'orjson refuse (entier > 64 bits…) repasse
+par la stdlib.
+
+JSON_PROVIDER : "auto" (orjson si disponible), "orjson" ou "stdlib".
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    def _encode(self, obj, indent=False):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except orjson.JSONEncodeError:
+            kwargs = {"indent": 2} if indent else {"separators": (",", ":")}
+            return super().dumps(obj, **kwargs).encode()
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:  # options propres à json.dumps
+            return super().dumps(obj, **kwargs)
+        return self._encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self._encode(obj, indent) + b"\n", mimetype=self.mimetype)
+
+
+def init_app(app):
+    choice = app.config.get("JSON_PROVIDER", "auto")
+    if choice not in ("auto", "orjson", "stdlib"):
+        raise ValueError(f"JSON_PROVIDER inconnu: {choice}")
+    if choice == "orjson" and orjson is None:
+        raise RuntimeError("JSON_PROVIDER=orjson mais orjson n'est pas installé")
+    if choice != "stdlib" and orjson is not None:
+        app.json = OrjsonProvider(app)
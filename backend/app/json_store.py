@@ -0,0 +1,100 @@
+# app/json_store.py
+"""Lecture / écriture des fichiers JSON du catalogue (pins, catégories, demandes…).
+
+Point unique d'accès disque pour ces fichiers, chronométré pour /metrics.
+Les fichiers vivent dans DATA_DIR (voir app/config.py). `locked(path)`
+sérialise une lecture-modification-écriture entre threads et workers.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app
+
+from .metrics import metrics
+
+
+def data_path(filename):
+    """Chemin d'un fichier de données dans DATA_DIR."""
+    return os.path.join(current_app.config["DATA_DIR"], filename)
+
+
+_held = threading.local()
+
+
+@contextmanager
+def locked(path):
+    """Verrou exclusif sur `path` (flock sur <path>.lock) entre threads et
+    process ; réentrant dans un même thread."""
+    held = _held.__dict__.setdefault("paths", set())
+    if path in held:
+        yield
+        return
+    with open(path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        held.add(path)
+        try:
+            yield
+        finally:
+            held.discard(path)
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# au-delà, toute nouvelle écriture a forcément un autre mtime (FAT : 2 s)
+MTIME_GRANULARITY_NS = 2_000_000_000
+_digests = {}  # path -> ((inode, mtime, taille), empreinte)
+
+
+def file_version(path):
+    """Identifiant du contenu d'un fichier (empreinte), partagé entre workers
+    puisqu'il vient du disque.
+
+    mtime + taille ne suffisent pas : une écriture de même taille dans le même
+    tick de mtime (grossier sur certains systèmes de fichiers / overlays) ne
+    les change pas. L'empreinte n'est réutilisée sans relire le fichier que si
+    le mtime est plus vieux que MTIME_GRANULARITY_NS au moment du calcul (même
+    principe que l'index de git) : le plus souvent un simple stat."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return (path, None)
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    cached = _digests.get(path)
+    if cached is not None and cached[0] == key:
+        return (path, cached[1])
+
+    with open(path, "rb") as f:
+        digest = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    if time.time_ns() - st.st_mtime_ns > MTIME_GRANULARITY_NS:
+        _digests[path] = (key, digest)
+    return (path, digest)
+
+
+def read_json(path, default=None):
+    if not os.path.exists(path):
+        return [] if default is None else default
+    start = time.perf_counter()
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    metrics.observe_json(path, "read", time.perf_counter() - start)
+    return data
+
+
+def write_json(path, data):
+    """Écriture atomique (fichier temporaire + rename) : un lecteur voit
+    l'ancien ou le nouveau contenu, jamais un fichier à moitié écrit."""
+    start = time.perf_counter()
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    metrics.observe_json(path, "write", time.perf_counter() - start)
@@ -0,0 +1,205 @@
+# app/mail_outbox.py
+"""Boîte d'envoi transactionnelle.
+
+Les routes n'envoient plus de mail pendant la requête : `queue_mail` ajoute
+une ligne mail_outbox dans la même transaction que le user / token, et un
+thread par worker vide la table après le commit. Il réutilise une seule
+connexion SMTP pour tout un lot. Un échec est retenté avec un délai
+exponentiel jusqu'à MAIL_OUTBOX_MAX_ATTEMPTS.
+
+Les lignes d'un lot sont réservées (next_attempt_at repoussé de la durée
+d'un bail) dans une courte transaction, puis envoyées hors transaction :
+aucun verrou n'est gardé pendant l'envoi SMTP ni pendant le bridage. Une
+ligne d'un worker tué en cours d'envoi redevient due à la fin du bail.
+
+Les envois groupés (Mailing) passent par la même table, après les mails
+transactionnels, et sont limités à MAIL_SEND_RATE messages/s au total,
+tous workers confondus (seau partagé du limiteur de débit, app/ratelimit.py)
+pour rester sous les quotas du fournisseur SMTP.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask_mail import Message
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from .extensions import ForkSafeThread, db, mail
+from .metrics import metrics
+from .models import MailOutbox, Mailing
+from .ratelimit import limiter
+
+logger = logging.getLogger(__name__)
+
+_PENDING_FLAG = "mail_outbox_pending"
+SEND_RATE_KEY = "mail:send"
+
+
+def mark_pending():
+    """Réveille l'expéditeur au prochain commit de la session courante."""
+    db.session.info[_PENDING_FLAG] = True
+
+
+def queue_mail(subject, recipients, html=None, body=None):
+    """Ajoute les mails à la session courante ; envoyés après le commit."""
+    for recipient in recipients:
+        db.session.add(MailOutbox(recipient=recipient, subject=subject, html=html, body=body))
+    mark_pending()
+
+
+class OutboxSender(ForkSafeThread):
+    thread_name = "mail-outbox"
+
+    def __init__(self):
+        super().__init__()
+        self.app = None
+        self.batch_size = 50
+        self.poll_interval = 10.0
+        self.max_attempts = 6
+        self.backoff = 30.0
+        self.send_rate = 0.0
+        self._wake = threading.Event()
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = int(app.config.get("MAIL_OUTBOX_BATCH_SIZE", 50))
+        self.poll_interval = float(app.config.get("MAIL_OUTBOX_POLL_INTERVAL", 10.0))
+        self.max_attempts = int(app.config.get("MAIL_OUTBOX_MAX_ATTEMPTS", 6))
+        self.backoff = float(app.config.get("MAIL_OUTBOX_BACKOFF", 30.0))
+        self.send_rate = float(app.config.get("MAIL_SEND_RATE", 0.0))
+        app.before_request(self.ensure_started)
+
+    def wake(self):
+        self.ensure_started()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.drain()
+            except Exception:
+                logger.exception("Mail outbox drain failed")
+
+    def drain(self):
+        """Envoie tout ce qui est dû ; retourne le nombre de mails envoyés."""
+        sent = 0
+        with self.app.app_context():
+            try:
+                while True:
+                    batch_sent, claimed = self._send_batch()
+                    sent += batch_sent
+                    if claimed < self.batch_size:
+                        break
+            finally:
+                db.session.remove()
+        return sent
+
+    def _retry_delay(self, attempts):
+        return timedelta(seconds=min(self.backoff * 2 ** (attempts - 1), 6 * 3600))
+
+    def _lease(self):
+        # durée d'envoi d'un lot au débit maximal, avec de la marge
+        seconds = self.batch_size / self.send_rate if self.send_rate > 0 else 0
+        return timedelta(seconds=max(300, 2 * seconds))
+
+    def _send_batch(self):
+        now = datetime.utcnow()
+        # SKIP LOCKED : deux workers ne prennent jamais la même ligne ; le
+        # verrou ne dure que le temps de la réservation
+        rows = (
+            MailOutbox.query
+            .filter(MailOutbox.status == "pending", MailOutbox.next_attempt_at <= now)
+            # transactionnels (activation, reset) avant les envois groupés
+            .order_by(MailOutbox.mailing_id.isnot(None), MailOutbox.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not rows:
+            db.session.commit()
+            return 0, 0
+
+        mailing_ids = {row.mailing_id for row in rows if row.mailing_id}
+        mailings = {m.id: m.html for m in Mailing.query.filter(Mailing.id.in_(mailing_ids))} if mailing_ids else {}
+        jobs = [
+            {
+                "id": row.id,
+                "attempts": row.attempts or 0,
+                "message": self._message(row, mailings.get(row.mailing_id)),
+            }
+            for row in rows
+        ]
+        lease_until = now + self._lease()
+        for row in rows:
+            row.next_attempt_at = lease_until
+        db.session.commit()
+
+        results = []
+        sent = 0
+        try:
+            with mail.connect() as conn:
+                for job in jobs:
+                    self._throttle()
+                    start = time.perf_counter()
+                    try:
+                        conn.send(job["message"])
+                    except Exception as e:
+                        metrics.observe_smtp(time.perf_counter() - start, ok=False)
+                        results.append(self._failed(job, e))
+                    else:
+                        metrics.observe_smtp(time.perf_counter() - start)
+                        results.append({"id": job["id"], "status": "sent", "sent_at": datetime.utcnow()})
+                        sent += 1
+        except Exception as e:
+            # connexion SMTP impossible : le reste du lot est retenté plus tard
+            logger.warning("SMTP connection failed: %s", e)
+            handled = {result["id"] for result in results}
+            results += [self._failed(job, e) for job in jobs if job["id"] not in handled]
+
+        db.session.execute(update(MailOutbox), results)
+        db.session.commit()
+        return sent, len(jobs)
+
+    def _throttle(self):
+        """Attend un jeton du seau partagé par tous les workers (MAIL_SEND_RATE au total)."""
+        if self.send_rate <= 0:
+            return
+        while True:
+            allowed, tokens = limiter.backend.consume(SEND_RATE_KEY, 1, self.send_rate, time.time())
+            if allowed:
+                return
+            time.sleep(max(0.0, 1 - tokens) / self.send_rate)
+
+    def _message(self, row, mailing_html=None):
+        html = mailing_html if mailing_html is not None else row.html
+        return Message(subject=row.subject, recipients=[row.recipient], html=html, body=row.body)
+
+    def _failed(self, job, error):
+        """Valeurs à enregistrer pour un envoi raté (retenté plus tard ou abandonné)."""
+        attempts = job["attempts"] + 1
+        result = {"id": job["id"], "attempts": attempts, "last_error": str(error)[:1000]}
+        if attempts >= self.max_attempts:
+            result["status"] = "failed"
+            logger.error("Mail %s to %s abandoned after %d attempts",
+                         job["id"], job["message"].recipients[0], attempts)
+        else:
+            result["next_attempt_at"] = datetime.utcnow() + self._retry_delay(attempts)
+        return result
+
+
+outbox = OutboxSender()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_sender_after_commit(session):
+    if session.info.pop(_PENDING_FLAG, False) and outbox.app is not None:
+        outbox.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pending_after_rollback(session):
+    session.info.pop(_PENDING_FLAG, None)
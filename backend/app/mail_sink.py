@@ -0,0 +1,34 @@
+# app/mail_sink.py
+"""Backend de mail "file" : chaque message envoyé est écrit en .eml.
+
+Avec MAIL_BACKEND=file, Flask-Mail ne contacte aucun serveur
+(MAIL_SUPPRESS_SEND) et émet seulement le signal `email_dispatched`, que
+l'on écoute ici. Les tests lisent les mails dans MAIL_FILE_DIR.
+"""
+import os
+import time
+import uuid
+
+from flask_mail import email_dispatched
+
+
+def init_app(app):
+    if app.config.get("MAIL_BACKEND") == "file":
+        os.makedirs(app.config["MAIL_FILE_DIR"], exist_ok=True)
+        email_dispatched.connect(_write_message, weak=False)
+
+
+def _write_message(message, app):
+    if app.config.get("MAIL_BACKEND") != "file":
+        return
+    name = f"{time.time():.6f}-{uuid.uuid4().hex[:8]}.eml"
+    with open(os.path.join(app.config["MAIL_FILE_DIR"], name), "wb") as f:
+        f.write(message.as_bytes())
+
+
+def sent_messages(app):
+    """Chemins des .eml écrits, du plus ancien au plus récent."""
+    folder = app.config["MAIL_FILE_DIR"]
+    if not os.path.isdir(folder):
+        return []
+    return [os.path.join(folder, name) for name in sorted(os.listdir(folder))]
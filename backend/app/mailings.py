@@ -0,0 +1,138 @@
+# app/mailings.py
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy import insert, select
+
+from .extensions import db
+from .mail_outbox import mark_pending
+from .models import Role, User, Membership, Mailing, MailOutbox
+
+bp_mailings = Blueprint("mailings", __name__, url_prefix="/api/admin/mailings")
+
+# lignes insérées par executemany
+INSERT_CHUNK = 1000
+
+
+@bp_mailings.before_request
+@login_required
+def require_admin():
+    if getattr(current_user, "role", None) != Role.ADMIN:
+        return jsonify({"error": "Forbidden"}), 403
+
+
+def _recipients_query(role=None, annee=None):
+    q = (
+        select(User.email)
+        .where(User.email.isnot(None), User.is_active.is_(True))
+        .order_by(User.email)
+    )
+    if role:
+        q = q.where(User.role == role)
+    if annee:
+        q = q.join(Membership, Membership.user_id == User.id).where(Membership.annee == annee)
+    return q
+
+
+def _status_counts(mailing_ids):
+    rows = (
+        db.session.query(MailOutbox.mailing_id, MailOutbox.status, db.func.count(MailOutbox.id))
+        .filter(MailOutbox.mailing_id.in_(mailing_ids))
+        .group_by(MailOutbox.mailing_id, MailOutbox.status)
+        .all()
+    )
+    counts = {}
+    for mailing_id, status, n in rows:
+        counts.setdefault(mailing_id, {"pending": 0, "sent": 0, "failed": 0})[status] = n
+    return counts
+
+
+def _serialize(m, counts):
+    return {
+        "id": m.id,
+        "subject": m.subject,
+        "role": m.role,
+        "annee": m.annee,
+        "recipient_count": m.recipient_count,
+        "created_at": m.created_at.isoformat(),
+        "status": counts.get(m.id, {"pending": 0, "sent": 0, "failed": 0}),
+    }
+
+
+@bp_mailings.post("")
+def create_mailing():
+    """Crée un envoi groupé : {subject, html, role?, annee?}."""
+    data = request.get_json(silent=True) or {}
+    subject = (data.get("subject") or "").strip()
+    html = (data.get("html") or "").strip()
+    if not subject or not html:
+        return jsonify({"error": "Champs requis: subject, html"}), 400
+
+    role = None
+    if data.get("role"):
+        try:
+            role = Role(str(data["role"]).lower())
+        except ValueError:
+            return jsonify({"error": "Rôle invalide"}), 400
+    annee = None
+    if data.get("annee"):
+        try:
+            annee = int(str(data["annee"]).split("-", 1)[0])
+        except ValueError:
+            return jsonify({"error": "Année invalide"}), 400
+
+    mailing = Mailing(
+        subject=subject,
+        html=html,
+        role=role.value if role else None,
+        annee=annee,
+        created_by=current_user.id,
+    )
+    db.session.add(mailing)
+    db.session.flush()
+
+    # une seule requête, lue par paquets ; les lignes de la boîte d'envoi sont
+    # insérées par lots (le html reste dans Mailing)
+    result = db.session.execute(_recipients_query(role, annee).execution_options(yield_per=INSERT_CHUNK))
+    total = 0
+    for chunk in result.partitions():
+        db.session.execute(insert(MailOutbox), [
+            {"mailing_id": mailing.id, "recipient": email, "subject": subject}
+            for (email,) in chunk
+        ])
+        total += len(chunk)
+
+    if total == 0:
+        db.session.rollback()
+        return jsonify({"error": "Aucun destinataire"}), 400
+
+    mailing.recipient_count = total
+    mark_pending()
+    db.session.commit()
+    return jsonify({"ok": True, "id": mailing.id, "recipient_count": total}), 201
+
+
+@bp_mailings.get("")
+def list_mailings():
+    mailings = Mailing.query.order_by(Mailing.created_at.desc()).all()
+    counts = _status_counts([m.id for m in mailings]) if mailings else {}
+    return jsonify([_serialize(m, counts) for m in mailings])
+
+
+@bp_mailings.get("/<int:mailing_id>")
+def get_mailing(mailing_id):
+    mailing = Mailing.query.get(mailing_id)
+    if not mailing:
+        return jsonify({"error": "Envoi introuvable"}), 404
+
+    failed = (
+        MailOutbox.query
+        .filter(MailOutbox.mailing_id == mailing_id, MailOutbox.status != "sent", MailOutbox.attempts > 0)
+        .order_by(MailOutbox.id)
+        .all()
+    )
+    data = _serialize(mailing, _status_counts([mailing_id]))
+    data["errors"] = [
+        {"recipient": r.recipient, "status": r.status, "attempts": r.attempts, "last_error": r.last_error}
+        for r in failed
+    ]
+    return jsonify(data)
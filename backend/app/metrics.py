@@ -0,0 +1,153 @@
+# app/metrics.py
+"""Métriques Prometheus exposées sur /metrics.
+
+  - requêtes HTTP : nombre et latence par blueprint / endpoint / méthode / code
+  - SQL : nombre de requêtes et temps passé en base par requête HTTP,
+          latence de chaque requête SQL (écouteurs partagés avec
+          sql_profiler.py : une seule mesure par requête SQL)
+  - stockage JSON (pins, catégories, …) : temps de lecture / écriture
+  - SMTP : latence d'envoi et échecs
+  - pool SQLAlchemy : connexions sorties, checkouts, nouvelles connexions
+
+Avec gunicorn, chaque worker a ses propres compteurs : si
+PROMETHEUS_MULTIPROC_DIR est défini (voir gunicorn.conf.py), les valeurs
+sont écrites dans ce dossier et /metrics agrège tous les workers.
+prometheus_client est optionnel : sans lui tout est inactif et /metrics
+répond 503.
+
+/metrics n'est pas routé par nginx (seul /api/ l'est) : il se scrape
+directement sur backend:8000 depuis le réseau interne.
+"""
+import os
+import time
+
+from flask import g, request, jsonify
+from sqlalchemy import event
+
+from .sql_profiler import sql_profiler
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Gauge, Histogram
+except ImportError:  # dépendance optionnelle
+    prometheus_client = None
+
+# bornes adaptées à une petite API (5 ms -> 10 s)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self._engines = set()
+
+    def init_app(self, app):
+        self.enabled = prometheus_client is not None and app.config.get("METRICS_ENABLED", True)
+        app.add_url_rule("/metrics", "metrics", self.export)
+        if not self.enabled:
+            return
+        if not hasattr(self, "http_requests"):
+            self._create()
+
+        sql_profiler.collect_requests(app)
+        if self.sql_latency.observe not in sql_profiler.observers:
+            sql_profiler.observers.append(self.sql_latency.observe)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        with app.app_context():
+            from .extensions import db
+            self._watch_engine(db.engine)
+
+    def _create(self):
+        labels = ["blueprint", "endpoint", "method", "status"]
+        self.http_requests = Counter("http_requests_total", "Requêtes HTTP", labels)
+        self.http_latency = Histogram(
+            "http_request_duration_seconds", "Latence des requêtes HTTP", labels[:3], buckets=LATENCY_BUCKETS)
+        self.sql_per_request = Histogram(
+            "sql_queries_per_request", "Requêtes SQL par requête HTTP", ["endpoint"], buckets=QUERY_COUNT_BUCKETS)
+        self.sql_time_per_request = Histogram(
+            "sql_time_per_request_seconds", "Temps SQL par requête HTTP", ["endpoint"], buckets=LATENCY_BUCKETS)
+        self.sql_latency = Histogram("sql_query_duration_seconds", "Latence des requêtes SQL", buckets=LATENCY_BUCKETS)
+        self.json_store = Histogram(
+            "json_store_duration_seconds", "Lecture/écriture des fichiers JSON", ["file", "operation"],
+            buckets=LATENCY_BUCKETS)
+        self.smtp_latency = Histogram("smtp_send_duration_seconds", "Envoi SMTP d'un mail", buckets=LATENCY_BUCKETS)
+        self.smtp_failures = Counter("smtp_send_failures_total", "Envois SMTP en échec")
+        self.pool_checked_out = Gauge(
+            "db_pool_checked_out", "Connexions sorties du pool", multiprocess_mode="livesum")
+        self.pool_checkouts = Counter("db_pool_checkouts_total", "Checkouts de connexion")
+        self.pool_connects = Counter("db_pool_connections_total", "Nouvelles connexions ouvertes par le pool")
+
+    # ---------- HTTP ----------
+    def _before_request(self):
+        g._metrics_start = time.perf_counter()
+
+    def _after_request(self, response):
+        start = g.pop("_metrics_start", None)
+        if start is None:
+            return response
+        blueprint = request.blueprint or "app"
+        endpoint = request.endpoint or "none"
+        elapsed = time.perf_counter() - start
+        self.http_requests.labels(blueprint, endpoint, request.method, str(response.status_code)).inc()
+        self.http_latency.labels(blueprint, endpoint, request.method).observe(elapsed)
+        stats = g.get("_sql_stats")  # alimenté par sql_profiler
+        if stats is not None:
+            self.sql_per_request.labels(endpoint).observe(stats.count)
+            self.sql_time_per_request.labels(endpoint).observe(stats.time)
+        return response
+
+    # ---------- Pool ----------
+    def _watch_engine(self, engine):
+        if engine in self._engines:
+            return
+        self._engines.add(engine)
+
+        @event.listens_for(engine, "checkout")
+        def checkout(dbapi_conn, record, proxy):
+            self.pool_checkouts.inc()
+            self.pool_checked_out.inc()
+
+        @event.listens_for(engine, "checkin")
+        def checkin(dbapi_conn, record):
+            self.pool_checked_out.dec()
+
+        @event.listens_for(engine, "connect")
+        def connect(dbapi_conn, record):
+            self.pool_connects.inc()
+
+    # ---------- Mesures appelées par les autres modules ----------
+    def observe_json(self, path, operation, seconds):
+        if self.enabled:
+            self.json_store.labels(os.path.basename(path), operation).observe(seconds)
+
+    def observe_smtp(self, seconds, ok=True):
+        if self.enabled:
+            self.smtp_latency.observe(seconds)
+            if not ok:
+                self.smtp_failures.inc()
+
+    # ---------- Export ----------
+    def export(self):
+        if prometheus_client is None:
+            return jsonify({"error": "Métriques indisponibles (prometheus_client non installé)"}), 503
+        if not self.enabled:
+            return jsonify({"error": "Métriques désactivées (METRICS_ENABLED)"}), 503
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            from prometheus_client import CollectorRegistry, multiprocess
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = prometheus_client.REGISTRY
+        return prometheus_client.generate_latest(registry), 200, {"Content-Type": prometheus_client.CONTENT_TYPE_LATEST}
+
+
+def mark_process_dead(pid):
+    """Hook gunicorn child_exit : nettoie les fichiers du worker mort (mode multiprocess)."""
+    if prometheus_client is not None and os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
+
+
+metrics = Metrics()
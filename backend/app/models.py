@@ -7,6 +7,18 @@ import uuid
 
 from .extensions import db
 
+# uuid natif sous PostgreSQL (16 octets) ; côté Python les ids restent des str
+# (cookies de session et tokens QR inchangés)
+UUID = db.Uuid(as_uuid=False)
+
+
+def parse_uuid(value):
+    """Forme canonique d'un uuid, ou None si la valeur n'en est pas un."""
+    try:
+        return str(uuid.UUID(str(value)))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
 class Role(Enum):
     MEMBER = "member"
     ADMIN  = "admin"
@@ -16,14 +28,15 @@ class Role(Enum):
 class User(UserMixin, db.Model):
     __tablename__ = "users"
 
-    id = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(UUID, primary_key=True, default=lambda: str(uuid.uuid4()))
     nom = db.Column(db.String, nullable=False)
     prenom = db.Column(db.String, nullable=False)
     member_id = db.Column(db.String(6), unique=True, nullable=True)
     email = db.Column(db.String, unique=True, nullable=True)
     password_hash = db.Column(db.String, nullable=False)
 
-    reset_token = db.Column(db.String(36), nullable=True)
+    # seuls les sha256 des tokens sont stockés (cf. passwords.hash_token)
+    reset_token_hash = db.Column(db.String(64), nullable=True, unique=True, index=True)
     reset_token_expiry = db.Column(db.DateTime, nullable=True)
 
     role = db.Column(db.Enum(Role, name="role_enum"), default=Role.MEMBER, nullable=False)
@@ -39,7 +52,7 @@ class User(UserMixin, db.Model):
         backref="user",
         cascade="all, delete-orphan"
     )
-    activation_token = db.Column(db.String, nullable=True)
+    activation_token_hash = db.Column(db.String(64), nullable=True, unique=True, index=True)
     activation_token_expiry = db.Column(db.DateTime, nullable=True)
     is_active = db.Column(db.Boolean, default=False)
 
@@ -47,9 +60,9 @@ class User(UserMixin, db.Model):
 class Membership(db.Model):
     __tablename__ = "membership"
 
-    id = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(UUID, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(
-        db.String,
+        UUID,
         db.ForeignKey("users.id", ondelete="CASCADE"),
         nullable=False
     )
@@ -65,9 +78,9 @@ class Membership(db.Model):
 class Order(db.Model):
     __tablename__ = "order"
 
-    id = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(UUID, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(
-        db.String,
+        UUID,
         db.ForeignKey("users.id", ondelete="CASCADE"),
         nullable=False
     )
@@ -80,17 +93,124 @@ class Order(db.Model):
         cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        db.Index("ix_order_user_id_created_at", "user_id", "created_at"),
+        db.Index("ix_order_created_at", "created_at"),
+    )
+
 
 class OrderItem(db.Model):
     __tablename__ = "order_item"
 
-    id = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(UUID, primary_key=True, default=lambda: str(uuid.uuid4()))
     order_id = db.Column(
-        db.String,
+        UUID,
         db.ForeignKey("order.id", ondelete="CASCADE"),
-        nullable=False
+        nullable=False,
+        index=True
     )
     pin_id = db.Column(db.String, nullable=False)
     title = db.Column(db.String, nullable=False)
     price = db.Column(db.Float, nullable=False)
     quantity = db.Column(db.Integer, default=1)
+
+
+class ScanLog(db.Model):
+    __tablename__ = "scan_log"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    scanned_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    valid = db.Column(db.Boolean, nullable=False)
+    reason = db.Column(db.String(32), nullable=False)
+    annee = db.Column(db.Integer, nullable=True)
+    # pas de FK : le journal doit survivre à la suppression d'un user
+    user_id = db.Column(db.String, nullable=True)
+
+
+class RateLimitBucket(db.Model):
+    __tablename__ = "rate_limit_bucket"
+
+    key = db.Column(db.String(255), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False)  # epoch (horloge applicative)
+    allowed = db.Column(db.Boolean, nullable=False, default=True)
+
+
+class Mailing(db.Model):
+    __tablename__ = "mailing"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    subject = db.Column(db.String, nullable=False)
+    html = db.Column(db.Text, nullable=False)
+    role = db.Column(db.String, nullable=True)    # filtre de sélection (None = tous)
+    annee = db.Column(db.Integer, nullable=True)  # filtre de sélection (None = toutes)
+    recipient_count = db.Column(db.Integer, default=0, nullable=False)
+    created_by = db.Column(db.String, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class MailOutbox(db.Model):
+    __tablename__ = "mail_outbox"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # rempli pour un envoi groupé : sujet/html lus depuis Mailing
+    mailing_id = db.Column(
+        db.Integer,
+        db.ForeignKey("mailing.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True
+    )
+    recipient = db.Column(db.String, nullable=False)
+    subject = db.Column(db.String, nullable=False)
+    html = db.Column(db.Text, nullable=True)
+    body = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(16), default="pending", nullable=False)  # pending | sent | failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_mail_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+
+class SalesRollup(db.Model):
+    """Agrégat quotidien des articles commandés, par statut de commande et par pin."""
+    __tablename__ = "sales_rollup"
+
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(32), primary_key=True)
+    pin_id = db.Column(db.String, primary_key=True)
+    units = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Float, default=0, nullable=False)
+
+
+class OrderRollup(db.Model):
+    """Agrégat quotidien des commandes (nombre et montant) par statut."""
+    __tablename__ = "order_rollup"
+
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(32), primary_key=True)
+    orders = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Float, default=0, nullable=False)
+
+
+class ResourceVersion(db.Model):
+    """Compteur de version d'une ressource (ETag, synchronisation des clients)."""
+    __tablename__ = "resource_version"
+
+    key = db.Column(db.String(255), primary_key=True)
+    version = db.Column(db.BigInteger, default=0, nullable=False)
+
+
+class InvalidationEvent(db.Model):
+    """Événement d'invalidation de cache (bus entre workers, bases sans LISTEN/NOTIFY)."""
+    __tablename__ = "invalidation_event"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    channel = db.Column(db.String(64), nullable=False)
+    key = db.Column(db.String(255), nullable=False, default="")
+    origin = db.Column(db.String(128), nullable=False)
+    created_at = db.Column(db.Float, nullable=False)  # epoch (horloge applicative)
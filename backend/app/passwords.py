@@ -0,0 +1,76 @@
+# app/passwords.py
+"""Hachage des mots de passe.
+
+Méthode et coût réglables via PASSWORD_HASH_METHOD (format werkzeug, ex:
+"scrypt:16384:8:1" ou "pbkdf2:sha256:600000"). Les calculs tournent dans un
+pool de PASSWORD_HASH_WORKERS threads : hashlib libère le GIL pendant
+scrypt/pbkdf2, et le pool borne le nombre de hachages simultanés d'un worker
+gthread sans bloquer ses autres threads. L'appelant attend le résultat : le
+pool ne sert donc qu'avec plusieurs threads par worker. Avec
+PASSWORD_HASH_WORKERS=0 (workers sync, voir gunicorn.conf.py), le hachage
+se fait directement dans le thread de la requête, sans PASSWORD_HASH_TIMEOUT.
+"""
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = "scrypt"
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_prefixes = {}
+
+
+def _get_executor(workers):
+    # recréé après un fork (les threads du parent ne survivent pas)
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _method():
+    return current_app.config.get("PASSWORD_HASH_METHOD") or DEFAULT_METHOD
+
+
+def _run(fn, *args):
+    workers = int(current_app.config.get("PASSWORD_HASH_WORKERS", 2))
+    if workers <= 0:
+        return fn(*args)  # une requête à la fois par worker : pas de saut de thread
+    timeout = current_app.config.get("PASSWORD_HASH_TIMEOUT")
+    return _get_executor(workers).submit(fn, *args).result(timeout=timeout)
+
+
+def method_prefix(method):
+    """Préfixe complet stocké dans le hash (ex: 'scrypt' -> 'scrypt:32768:8:1')."""
+    if method not in _prefixes:
+        _prefixes[method] = generate_password_hash("", method=method).split("$", 1)[0]
+    return _prefixes[method]
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, _method())
+
+
+def verify_password(pwhash, password):
+    if not pwhash:
+        return False
+    return _run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """True si le hash a été produit avec une autre méthode/coût que la config actuelle."""
+    return pwhash.split("$", 1)[0] != method_prefix(_method())
+
+
+def hash_token(token):
+    """Empreinte stockée en DB pour les tokens d'activation / de reset."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
@@ -2,18 +2,16 @@ from flask import Blueprint, request, jsonify
 import os, json
 from flask_login import login_required, current_user
 from .models import Role
+from .json_store import read_json, write_json, data_path, file_version
+from .http_cache import conditional
 
 PENNE_FILE = "penne_requests.json"
 
 def read_penne_requests():
-    if not os.path.exists(PENNE_FILE):
-        return []
-    with open(PENNE_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return read_json(data_path(PENNE_FILE))
 
 def save_penne_requests(requests):
-    with open(PENNE_FILE, "w", encoding="utf-8") as f:
-        json.dump(requests, f, indent=2, ensure_ascii=False)
+    write_json(data_path(PENNE_FILE), requests)
 
 bp_admin_penne = Blueprint("admin_penne_requests", __name__, url_prefix="/api/admin/penne-requests")
 bp_user_penne = Blueprint("user_penne_requests", __name__, url_prefix="/api/penne-requests")
@@ -84,6 +82,7 @@ def add_request():
 # GET : toutes les demandes de l'utilisateur
 @bp_user_penne.get("/")
 @login_required
+@conditional(lambda: file_version(data_path(PENNE_FILE)), private=True)
 def get_user_requests():
     requests_list = read_penne_requests()
     user_requests = [r for r in requests_list if r["user_id"] == current_user.id]
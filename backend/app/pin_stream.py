@@ -0,0 +1,172 @@
+# app/pin_stream.py
+"""Flux Server-Sent Events des changements de stock : GET /api/pins/stream.
+
+Un diffuseur par worker : réveillé par le bus d'invalidation (canal
+"catalog", donc aussi par les écritures des autres workers), il calcule les
+changements depuis sa dernière version (index de /api/pins/changes) et pousse
+un événement par version du catalogue à toutes les connexions du process :
+
+    id: 42
+    event: stock
+    data: {"version": 42, "changed": [{"id": 1, "stock": 3, "available": true}], "deleted": []}
+
+Reprise : Last-Event-ID (reconnexion automatique d'EventSource) ou
+?since=<version> à la première connexion ; les changements manqués sont
+renvoyés d'abord, `event: reset` si l'historique ne remonte pas assez loin
+(recharger /api/pins/). Un commentaire `: ping` toutes les SSE_HEARTBEAT
+secondes garde la connexion ouverte à travers nginx. Un client trop lent
+(file pleine) reçoit `reset` et est déconnecté.
+
+Chaque connexion occupe un thread en gthread : en production le flux est
+servi par un worker gevent dédié (service backend-stream, voir
+gunicorn.conf.py et nginx.conf).
+"""
+import json
+import logging
+import queue
+import threading
+
+from flask import Blueprint, Response, request
+
+from .extensions import ForkSafeThread
+from .invalidation import bus
+from .routes_pins import catalog_index
+
+logger = logging.getLogger(__name__)
+
+bp_pin_stream = Blueprint("pin_stream", __name__)
+
+
+def _format(event, data=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data if data is not None else {}, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _payload(version, changed, deleted):
+    return {
+        "version": version,
+        "changed": [
+            {"id": p["id"], "stock": p.get("stock", 0), "available": p.get("stock", 0) > 0}
+            for p in changed
+        ],
+        "deleted": deleted,
+    }
+
+
+class StockBroadcaster(ForkSafeThread):
+    thread_name = "pin-stream"
+
+    def __init__(self):
+        super().__init__()
+        self.app = None
+        self.heartbeat = 15.0
+        self.queue_size = 100
+        self.version = 0
+        self._subscribers = set()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.heartbeat = float(app.config.get("SSE_HEARTBEAT", 15.0))
+        self.queue_size = int(app.config.get("SSE_QUEUE_SIZE", 100))
+        bus.subscribe("catalog", lambda key: self._wake.set())
+
+    # ---------- Diffusion ----------
+    def _before_start(self):
+        with self.app.app_context():
+            self.version = catalog_index().version
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                self.broadcast()
+            except Exception:
+                logger.exception("Pin stream broadcast failed")
+
+    def broadcast(self):
+        with self.app.app_context():
+            index = catalog_index()
+        if index.version <= self.version:
+            return
+        changed, deleted = index.changes(self.version)
+        self.version = index.version
+        event = (index.version, _format("stock", _payload(index.version, changed, deleted), index.version))
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                self._unsubscribe(q)
+                q.overflowed = True
+
+    def _unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    # ---------- Connexion ----------
+    def stream(self, since):
+        """Générateur SSE : rattrapage depuis `since` (None : rien) puis direct."""
+        self.ensure_started()
+        q = queue.Queue(maxsize=self.queue_size)
+        q.overflowed = False
+        with self._lock:
+            self._subscribers.add(q)  # avant le rattrapage : rien ne se perd entre les deux
+
+        index = catalog_index()
+        backlog = []
+        last = index.version
+        if since is not None:
+            if since > index.version or since < index.floor:
+                backlog.append(_format("reset", {"version": index.version}))
+            elif since < index.version:
+                changed, deleted = index.changes(since)
+                backlog.append(_format("stock", _payload(index.version, changed, deleted), index.version))
+
+        def generate():
+            try:
+                yield f"retry: 3000\n: connecté, version {last}\n\n"
+                yield from backlog
+                sent = last
+                while True:
+                    # file pleine : les événements en attente sont incomplets, inutile de les vider
+                    if q.overflowed:
+                        yield _format("reset", {"version": sent})
+                        return
+                    try:
+                        version, event = q.get(timeout=self.heartbeat)
+                    except queue.Empty:
+                        yield ": ping\n\n"
+                        continue
+                    if version > sent:
+                        sent = version
+                        yield event
+            finally:
+                self._unsubscribe(q)
+
+        return generate()
+
+
+broadcaster = StockBroadcaster()
+
+
+@bp_pin_stream.get("/api/pins/stream")
+def stream_pins():
+    since = request.headers.get("Last-Event-ID", type=int)
+    if since is None:
+        since = request.args.get("since", type=int)
+    return Response(
+        broadcaster.stream(since),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # nginx : pas de mise en tampon du flux
+        },
+    )
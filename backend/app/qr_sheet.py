@@ -0,0 +1,197 @@
+# app/qr_sheet.py
+"""Planches imprimables de QR codes (PDF A4) pour toute une année.
+
+Le rendu des QR est le coût dominant : chaque page (QR + étiquettes) est
+rendue et compressée dans un pool de process, puis écrite dans le PDF dès
+qu'elle arrive, dans l'ordre ; `iter_pdf` produit le fichier par morceaux,
+envoyés au client au fil de l'eau. Au plus `2 × workers` pages sont en
+cours ou en attente : la mémoire ne dépend pas du nombre de cartes.
+
+Le pool est créé une fois par process (worker gunicorn) et réutilisé ; ses
+process viennent d'un forkserver et non d'un fork du worker, qui fait
+tourner des threads de fond (fork d'un process multi-thread : verrous
+bloqués). Les fonctions exécutées dans le pool restent au niveau module
+pour être picklables ; le script principal doit être protégé par
+`if __name__ == "__main__"` (gunicorn et flask le sont).
+"""
+import multiprocessing
+import os
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+
+# A4 à 150 dpi
+PDF_RESOLUTION = 150.0
+PAGE_SIZE = (1240, 1754)
+PAGE_MARGIN = 60
+COLUMNS = 4
+ROWS = 5
+LABEL_HEIGHT = 40
+QR_BOX_SIZE = 4
+QR_BORDER = 2
+# masque fixe : évite d'évaluer les 8 masques par QR (~5x plus rapide),
+# le code reste valide et lisible par tous les scanners
+QR_MASK_PATTERN = 0
+
+
+def render_qr(url):
+    """Rend un QR en image 1 bit ; retourne (size, bytes)."""
+    qr = qrcode.QRCode(
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        border=QR_BORDER,
+        mask_pattern=QR_MASK_PATTERN,
+    )
+    qr.add_data(url)
+    qr.make(fit=True)
+
+    # matrice -> image directement, sans passer par l'image factory (dessin module par module)
+    matrix = qr.get_matrix()
+    n = len(matrix)
+    pixels = bytes(0 if dark else 255 for line in matrix for dark in line)
+    side = n * QR_BOX_SIZE
+    img = Image.frombytes("L", (n, n), pixels).resize((side, side), Image.NEAREST).convert("1")
+    return img.size, img.tobytes()
+
+
+def _cell_size():
+    width = (PAGE_SIZE[0] - 2 * PAGE_MARGIN) // COLUMNS
+    height = (PAGE_SIZE[1] - 2 * PAGE_MARGIN) // ROWS
+    return width, height
+
+
+def _new_page():
+    return Image.new("1", PAGE_SIZE, 1)
+
+
+def _paste_card(page, slot, qr_img, label, font):
+    cell_w, cell_h = _cell_size()
+    col, row = slot % COLUMNS, slot // COLUMNS
+    x0 = PAGE_MARGIN + col * cell_w
+    y0 = PAGE_MARGIN + row * cell_h
+
+    # on réduit si le QR (URL longue) dépasse la case
+    max_side = min(cell_w, cell_h - LABEL_HEIGHT)
+    if qr_img.size[0] > max_side:
+        qr_img = qr_img.resize((max_side, max_side), Image.NEAREST)
+    qx = x0 + (cell_w - qr_img.size[0]) // 2
+    page.paste(qr_img, (qx, y0))
+
+    draw = ImageDraw.Draw(page)
+    text_w = draw.textlength(label, font=font)
+    draw.text((x0 + (cell_w - text_w) / 2, y0 + qr_img.size[1] + 8), label, fill=0, font=font)
+
+
+def render_page(cards):
+    """Rend une page complète pour au plus COLUMNS × ROWS (url, label) ;
+    retourne (size, données 1 bit compressées zlib) pour le PDF."""
+    font = ImageFont.load_default()
+    page = _new_page()
+    for slot, (url, label) in enumerate(cards):
+        size, data = render_qr(url)
+        _paste_card(page, slot, Image.frombytes("1", size, data), label, font)
+    return page.size, zlib.compress(page.tobytes(), 6)
+
+
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    global _pool, _pool_key
+    key = (os.getpid(), workers)
+    with _pool_lock:
+        if _pool_key != key:
+            if _pool is not None and _pool_key[0] == os.getpid():
+                _pool.shutdown(wait=False)
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload([__name__])
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _pool_key = key
+        return _pool
+
+
+def iter_pages(cards, workers=None):
+    """Génère les pages rendues (size, données), dans l'ordre."""
+    per_page = COLUMNS * ROWS
+    workers = workers or os.cpu_count() or 1
+    pool = _get_pool(workers)
+
+    pending = deque()
+    try:
+        for i in range(0, len(cards), per_page):
+            pending.append(pool.submit(render_page, cards[i:i + per_page]))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:  # client parti : pages restantes abandonnées
+            future.cancel()
+
+
+class _PdfWriter:
+    """PDF minimal, écrit séquentiellement : une image 1 bit par page.
+    Objets 1 (catalogue) et 2 (arbre des pages) écrits à la fin."""
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+        self.pages = []
+
+    def _chunk(self, data):
+        self.offset += len(data)
+        return data
+
+    def _obj(self, number, body, stream=None):
+        self.offsets[number] = self.offset
+        data = b"%d 0 obj\n" % number + body
+        if stream is not None:
+            data += b"\nstream\n" + stream + b"\nendstream"
+        return self._chunk(data + b"\nendobj\n")
+
+    def header(self):
+        return self._chunk(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def page(self, size, data):
+        width, height = size
+        w_pt, h_pt = width * 72.0 / PDF_RESOLUTION, height * 72.0 / PDF_RESOLUTION
+        image, contents, page = (len(self.offsets) + 3 + i for i in range(3))
+        self.pages.append(page)
+        content = b"q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q" % (w_pt, h_pt)
+        return b"".join([
+            self._obj(image, b"<< /Type /XObject /Subtype /Image /Width %d /Height %d "
+                             b"/ColorSpace /DeviceGray /BitsPerComponent 1 /Filter /FlateDecode "
+                             b"/Length %d >>" % (width, height, len(data)), data),
+            self._obj(contents, b"<< /Length %d >>" % len(content), content),
+            self._obj(page, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] "
+                            b"/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>"
+                            % (w_pt, h_pt, image, contents)),
+        ])
+
+    def trailer(self):
+        kids = b" ".join(b"%d 0 R" % n for n in self.pages)
+        out = self._obj(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.pages)))
+        out += self._obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref = self.offset
+        size = max(self.offsets) + 1
+        lines = [b"xref\n0 %d\n" % size, b"0000000000 65535 f \n"]
+        lines += [b"%010d 00000 n \n" % self.offsets[n] for n in range(1, size)]
+        lines.append(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref))
+        return out + self._chunk(b"".join(lines))
+
+
+def iter_pdf(cards, workers=None):
+    """Planche PDF de (url, label), produite par morceaux de bytes (une page à la fois)."""
+    writer = _PdfWriter()
+    yield writer.header()
+    for size, data in iter_pages(cards, workers=workers):
+        yield writer.page(size, data)
+    if not writer.pages:
+        yield writer.page(PAGE_SIZE, zlib.compress(_new_page().tobytes()))
+    yield writer.trailer()
+
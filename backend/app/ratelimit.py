@@ -0,0 +1,183 @@
+# app/ratelimit.py
+"""Limitation de débit par seau à jetons (token bucket).
+
+Chaque règle "N/secondes" donne un seau de capacité N rechargé à N/secondes
+jetons par seconde. Deux backends :
+  - "memory"   : dict en process (tests, dev)
+  - "database" : table rate_limit_bucket, un seul UPSERT atomique par seau,
+                 partagé entre tous les workers gunicorn
+La vérification se fait avant la vue, donc avant toute requête sur users
+ou tout hachage de mot de passe.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request
+from sqlalchemy import case, delete
+
+from .extensions import db, upsert_insert
+from .models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+# règles par défaut : endpoint -> {type de clé -> "N/secondes"}
+# (IP plus large : tout le campus peut sortir par la même adresse)
+DEFAULT_RULES = {
+    "login": {"ip": "30/60", "account": "5/60"},
+    "register": {"ip": "10/3600", "account": "3/3600"},
+    "password_reset": {"ip": "10/3600", "account": "3/3600"},
+}
+
+
+def parse_rule(rule):
+    count, _, seconds = str(rule).partition("/")
+    capacity = float(count)
+    period = float(seconds or 1)
+    return capacity, capacity / period
+
+
+class MemoryBackend:
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate, now):
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+        return allowed, tokens
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class DatabaseBackend:
+    # nettoyage des seaux inactifs tous les N appels (par process)
+    PRUNE_EVERY = 1000
+    PRUNE_AFTER = 24 * 3600
+
+    def __init__(self):
+        self._calls = 0
+
+    def consume(self, key, capacity, rate, now):
+        table = RateLimitBucket.__table__
+
+        refill = table.c.tokens + (now - table.c.updated_at) * rate
+        refilled = case((refill > capacity, capacity), else_=refill)
+        stmt = upsert_insert(table).values(key=key, tokens=capacity - 1, updated_at=now, allowed=True)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={
+                # les deux expressions lisent l'ancienne ligne
+                "tokens": case((refilled >= 1, refilled - 1), else_=refilled),
+                "allowed": refilled >= 1,
+                "updated_at": now,
+            },
+        ).returning(table.c.allowed, table.c.tokens)
+
+        with db.engine.begin() as conn:
+            allowed, tokens = conn.execute(stmt).one()
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY == 0:
+                conn.execute(delete(table).where(table.c.updated_at < now - self.PRUNE_AFTER))
+        return bool(allowed), tokens
+
+    def reset(self):
+        with db.engine.begin() as conn:
+            conn.execute(delete(RateLimitBucket.__table__))
+
+
+BACKENDS = {"memory": MemoryBackend, "database": DatabaseBackend}
+
+
+# ---------- Clés ----------
+def by_ip():
+    return request.remote_addr or "unknown"
+
+def by_account():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return None
+    ident = str(data.get("email") or data.get("identifiant") or "").strip().lower()
+    return ident or None
+
+
+def bucket_key(name, kind, value):
+    """Clé du seau : la valeur (email envoyé par le client, longueur libre)
+    est hachée pour tenir dans rate_limit_bucket.key (255)."""
+    return f"{name}:{kind}:{hashlib.sha256(value.encode()).hexdigest()}"
+
+
+class RateLimiter:
+    def __init__(self):
+        self.backend = None
+        self.rules = DEFAULT_RULES
+
+    def init_app(self, app):
+        name = app.config.get("RATELIMIT_BACKEND", "database")
+        if name not in BACKENDS:
+            raise ValueError(f"RATELIMIT_BACKEND inconnu: {name}")
+        self.backend = BACKENDS[name]()
+        self.rules = {**DEFAULT_RULES, **app.config.get("RATELIMIT_RULES", {})}
+
+    def limit(self, name, **key_funcs):
+        """Décorateur : `@limiter.limit("login", ip=by_ip, account=by_account)`."""
+        def decorator(view):
+            @wraps(view)
+            def wrapped(*args, **kwargs):
+                if not current_app.config.get("RATELIMIT_ENABLED", True):
+                    return view(*args, **kwargs)
+
+                now = time.time()
+                tightest = None
+                blocked = None
+                for kind, key_func in key_funcs.items():
+                    value = key_func()
+                    if value is None:
+                        continue
+                    capacity, rate = parse_rule(self.rules[name][kind])
+                    try:
+                        allowed, tokens = self.backend.consume(bucket_key(name, kind, value), capacity, rate, now)
+                    except Exception:
+                        # on laisse passer plutôt que de bloquer toute l'auth
+                        logger.exception("Rate limit backend error")
+                        continue
+                    state = (tokens, capacity, rate)
+                    if tightest is None or tokens < tightest[0]:
+                        tightest = state
+                    if not allowed and (blocked is None or tokens < blocked[0]):
+                        blocked = state
+
+                if blocked:
+                    tokens, capacity, rate = blocked
+                    resp = make_response(jsonify({"error": "Trop de tentatives, réessaie plus tard."}), 429)
+                    resp.headers["Retry-After"] = str(math.ceil((1 - tokens) / rate))
+                    self._set_headers(resp, blocked)
+                    return resp
+
+                resp = make_response(view(*args, **kwargs))
+                if tightest:
+                    self._set_headers(resp, tightest)
+                return resp
+            return wrapped
+        return decorator
+
+    @staticmethod
+    def _set_headers(resp, state):
+        tokens, capacity, rate = state
+        resp.headers["X-RateLimit-Limit"] = str(int(capacity))
+        resp.headers["X-RateLimit-Remaining"] = str(max(0, int(tokens)))
+        # secondes avant que le seau soit de nouveau plein
+        resp.headers["X-RateLimit-Reset"] = str(math.ceil((capacity - tokens) / rate))
+
+
+limiter = RateLimiter()
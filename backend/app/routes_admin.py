@@ -1,14 +1,20 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from werkzeug.security import generate_password_hash
-from sqlalchemy.orm import joinedload
-from .models import db, User, Role, Membership, Order, OrderItem
+from sqlalchemy import delete
+from sqlalchemy.orm import joinedload, selectinload
+from .models import db, User, Role, Membership, Order, OrderItem, parse_uuid
+from .passwords import hash_password
+from .user_cache import invalidate_user
+from .analytics import order_contribution, apply_order, apply_orders
+from .json_store import read_json, data_path, locked
+from .versions import bump_version, memberships_key
+from .cart import validate_cart
+from . import routes_pins
 import re
 import json
 import os
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-PINS_FILE = os.path.join(BASE_DIR, "..", "pins.json")
+PINS_FILE = "pins.json"
 
 bp_admin = Blueprint("admin", __name__)
 bp_orders = Blueprint("orders", __name__)
@@ -18,22 +24,26 @@ bp_admin_orders = Blueprint("admin_orders", __name__)
 
 def read_pins():
     """Retourne la liste des pins avec leur stock"""
-    if not os.path.exists(PINS_FILE):
-        return []
-    with open(PINS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return read_json(data_path(PINS_FILE))
 
 def update_pin_stock(pin_id, delta):
     """Met à jour le stock d’un pin en ajoutant delta (peut être négatif)"""
-    pins = read_pins()
-    pin = next((p for p in pins if p["id"] == pin_id), None)
-    if not pin:
-        return False
-    pin["stock"] = max(0, pin.get("stock", 0) + int(delta))  # stock minimum 0
-    # Sauvegarde dans le fichier JSON
-    with open(PINS_FILE, "w", encoding="utf-8") as f:
-        json.dump(pins, f, indent=2, ensure_ascii=False)
-    return True
+    return bool(update_pins_stock({pin_id: delta}))
+
+def update_pins_stock(deltas):
+    """Applique plusieurs deltas de stock {pin_id: delta} en une seule lecture/écriture du catalogue"""
+    with locked(data_path(PINS_FILE)):  # aucun delta perdu entre workers
+        pins = read_pins()
+        updated = []
+        for pin in pins:
+            delta = deltas.get(pin["id"])
+            if delta:
+                pin["stock"] = max(0, pin.get("stock", 0) + int(delta))  # stock minimum 0
+                updated.append(pin["id"])
+        if updated:
+            # Sauvegarde dans le fichier JSON (+ invalidation du catalogue dans tous les workers)
+            routes_pins.save_pins(pins)
+    return updated
 
 
 
@@ -41,6 +51,17 @@ def update_pin_stock(pin_id, delta):
 def is_admin():
     return current_user.is_authenticated and current_user.role == Role.ADMIN
 
+def locked_orders(query):
+    """Commandes verrouillées (SELECT ... FOR UPDATE) jusqu'au commit, relues
+    en base : la contribution retirée des agrégats (analytics) est celle du
+    statut réellement enregistré, même si un autre admin vient de le changer.
+    Tri par id : deux requêtes concurrentes verrouillent dans le même ordre."""
+    return query.order_by(Order.id).with_for_update(of=Order).populate_existing().all()
+
+def locked_order(order_id):
+    found = locked_orders(Order.query.filter(Order.id == order_id))
+    return found[0] if found else None
+
 @bp_admin.before_request
 @login_required
 def require_admin():
@@ -81,7 +102,7 @@ def users_collection():
             prenom=prenom,
             email=email,
             member_id=member_id,
-            password_hash=generate_password_hash(password),
+            password_hash=hash_password(password),
             role=role
         )
         db.session.add(user)
@@ -94,6 +115,8 @@ def users_collection():
             if annee and annee_code:
                 m = Membership(user_id=user.id, annee=annee, annee_code=annee_code)
                 db.session.add(m)
+        if cartes:
+            bump_version(memberships_key(user.id))
 
         db.session.commit()
         return jsonify({"ok": True, "id": user.id})
@@ -113,7 +136,7 @@ def users_collection():
         })
     return jsonify(result)
 
-@bp_admin.route("/api/admin/users/<user_id>/role", methods=["PUT"])
+@bp_admin.route("/api/admin/users/<uuid:user_id>/role", methods=["PUT"])
 @login_required
 def set_user_role(user_id):
     target = User.query.get(user_id)
@@ -131,9 +154,10 @@ def set_user_role(user_id):
 
     target.role = allowed[role_str]
     db.session.commit()
+    invalidate_user(target.id)
     return jsonify({"ok": True, "id": target.id, "role": role_str})
 
-@bp_admin.route("/api/admin/users/<user_id>", methods=["PUT"])
+@bp_admin.route("/api/admin/users/<uuid:user_id>", methods=["PUT"])
 @login_required
 def update_user(user_id):
     target = User.query.get(user_id)
@@ -157,15 +181,16 @@ def update_user(user_id):
             target.email = identifiant.lower()
 
     db.session.commit()
+    invalidate_user(target.id)
     return jsonify({"ok": True})
 
-@bp_admin.route("/api/admin/users/<user_id>", methods=["DELETE"])
+@bp_admin.route("/api/admin/users/<uuid:user_id>", methods=["DELETE"])
 @login_required
 def delete_user(user_id):
     if not is_admin():
         return jsonify({"error": "Forbidden"}), 403
 
-    target = User.query.get(user_id)
+    target = db.session.get(User, user_id)
     if not target:
         return jsonify({"error": "Utilisateur introuvable"}), 404
 
@@ -173,19 +198,33 @@ def delete_user(user_id):
         return jsonify({"error": "Impossible de supprimer votre propre compte."}), 400
 
     try:
-        # Supprimer toutes les commandes et leurs items
-        for order in target.orders:
-            for item in order.items:
-                db.session.delete(item)
-            db.session.delete(order)
+        # Supprimer toutes les commandes et leurs items (requêtes groupées)
+        orders = locked_orders(Order.query.options(selectinload(Order.items)).filter(Order.user_id == target.id))
+        apply_orders([order_contribution(order) for order in orders], -1)
+        order_ids = [order.id for order in orders]
+        if order_ids:
+            db.session.execute(
+                delete(OrderItem).where(OrderItem.order_id.in_(order_ids)),
+                execution_options={"synchronize_session": False},
+            )
+            db.session.execute(
+                delete(Order).where(Order.id.in_(order_ids)),
+                execution_options={"synchronize_session": False},
+            )
 
         # Supprimer toutes les memberships
-        for membership in target.memberships:
-            db.session.delete(membership)
+        db.session.execute(
+            delete(Membership).where(Membership.user_id == target.id),
+            execution_options={"synchronize_session": False},
+        )
 
         # Supprimer l'utilisateur
-        db.session.delete(target)
+        db.session.execute(
+            delete(User).where(User.id == target.id),
+            execution_options={"synchronize_session": False},
+        )
         db.session.commit()
+        invalidate_user(user_id)
         return jsonify({"ok": True})
     except Exception as e:
         db.session.rollback()
@@ -198,7 +237,12 @@ def list_orders():
     if not is_admin():
         return jsonify({"error": "Unauthorized"}), 403
 
-    orders = Order.query.order_by(Order.created_at.desc()).all()
+    orders = (
+        Order.query
+        .options(selectinload(Order.items), joinedload(Order.user))
+        .order_by(Order.created_at.desc())
+        .all()
+    )
     pins = read_pins()  # récupère tous les pins avec leur stock
     pin_map = {str(p.get("id")): p for p in pins}
 
@@ -227,13 +271,63 @@ def list_orders():
     return jsonify(data)
 
 
-@bp_admin_orders.route("/api/admin/orders/<order_id>", methods=["PATCH"])
+@bp_admin_orders.route("/api/admin/orders/picking-list", methods=["GET"])
+@login_required
+def picking_list():
+    """Quantités à préparer par pin pour les commandes en attente (?group=category)."""
+    if not is_admin():
+        return jsonify({"error": "Unauthorized"}), 403
+
+    status = request.args.get("status", "en attente")
+    rows = (
+        db.session.query(
+            OrderItem.pin_id,
+            db.func.min(OrderItem.title),
+            db.func.sum(OrderItem.quantity),
+            db.func.count(db.distinct(OrderItem.order_id)),
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .filter(Order.status == status)
+        .group_by(OrderItem.pin_id)
+        .all()
+    )
+
+    pin_map = {str(p.get("id")): p for p in read_pins()}
+    items = []
+    for pin_id, title, quantity, orders in rows:
+        pin = pin_map.get(str(pin_id)) or {}
+        stock = int(pin.get("stock", 0))
+        quantity = int(quantity or 0)
+        items.append({
+            "pin_id": pin_id,
+            "title": pin.get("title") or title,
+            "category": pin.get("category") or "Autre",
+            "quantity": quantity,
+            "orders": orders,
+            "stock": stock,
+            "shortfall": max(0, quantity - stock),
+        })
+    items.sort(key=lambda i: (-i["shortfall"], i["title"] or ""))
+
+    if request.args.get("group") == "category":
+        groups = {}
+        for item in items:
+            group = groups.setdefault(item["category"], {"category": item["category"], "quantity": 0, "shortfall": 0, "items": []})
+            group["quantity"] += item["quantity"]
+            group["shortfall"] += item["shortfall"]
+            group["items"].append(item)
+        return jsonify({"status": status, "categories": sorted(groups.values(), key=lambda g: g["category"])})
+
+    return jsonify({"status": status, "items": items})
+
+
+@bp_admin_orders.route("/api/admin/orders/<uuid:order_id>", methods=["PATCH"])
 @login_required
 def update_order_status(order_id):
     if not is_admin():
         return jsonify({"error": "Unauthorized"}), 403
 
-    order = Order.query.get(order_id)
+    order = locked_order(order_id)
     if not order:
         return jsonify({"error": "Commande introuvable"}), 404
 
@@ -264,6 +358,9 @@ def update_order_status(order_id):
                     "requested": item.quantity,
                 }), 400
 
+    # agrégats de ventes : la commande passe d'un statut à l'autre
+    apply_order(order_contribution(order), -1)
+    apply_order(order_contribution(order, new_status), 1)
     order.status = new_status
     db.session.commit()
 
@@ -298,16 +395,118 @@ def update_order_status(order_id):
 
 
 
-@bp_admin_orders.route("/api/admin/orders/<order_id>", methods=["DELETE"])
+@bp_admin_orders.route("/api/admin/orders/bulk-status", methods=["POST"])
+@login_required
+def bulk_update_order_status():
+    """Change le statut de plusieurs commandes : stock vérifié globalement, une transaction, une écriture du catalogue."""
+    if not is_admin():
+        return jsonify({"error": "Unauthorized"}), 403
+
+    data = request.get_json() or {}
+    new_status = data.get("status")
+    ids = data.get("ids") or []
+    if not new_status:
+        return jsonify({"error": "Status manquant"}), 400
+    if not isinstance(ids, list) or not ids:
+        return jsonify({"error": "Liste de commandes manquante"}), 400
+
+    failures = []
+    wanted = []
+    for raw in ids:
+        order_id = parse_uuid(raw)
+        if order_id is None:
+            failures.append({"id": raw, "error": "Identifiant invalide"})
+        elif order_id not in wanted:
+            wanted.append(order_id)
+
+    orders = {
+        o.id: o
+        for o in locked_orders(Order.query.options(selectinload(Order.items)).filter(Order.id.in_(wanted)))
+    } if wanted else {}
+
+    updated, skipped = [], []
+    removed, added = [], []
+
+    # contrôle du stock et écriture du catalogue sous le même verrou : aucune
+    # commande ou modification concurrente ne passe entre les deux
+    with locked(data_path(PINS_FILE)):
+        pins = read_pins()
+        pin_map = {str(p.get("id")): p for p in pins}
+        stock_changed = False
+
+        # les commandes sont servies dans l'ordre reçu tant que le stock suffit
+        for order_id in wanted:
+            order = orders.get(order_id)
+            if not order:
+                failures.append({"id": order_id, "error": "Commande introuvable"})
+                continue
+            if order.status == new_status:
+                skipped.append(order_id)
+                continue
+
+            going_to_shipped = order.status != "expédiée" and new_status == "expédiée"
+            leaving_shipped = order.status == "expédiée" and new_status != "expédiée"
+
+            needed = {}
+            for item in order.items:
+                needed[str(item.pin_id)] = needed.get(str(item.pin_id), 0) + item.quantity
+
+            if going_to_shipped:
+                error = None
+                for pin_id, quantity in needed.items():
+                    pin = pin_map.get(pin_id)
+                    if not pin:
+                        error = {"error": f"Article introuvable pour l'id {pin_id}"}
+                    elif quantity > int(pin.get("stock", 0)):
+                        title = pin.get("title") or "cet article"
+                        error = {"error": f"Stock insuffisant pour {title}",
+                                 "available": int(pin.get("stock", 0)), "requested": quantity}
+                    if error:
+                        break
+                if error:
+                    failures.append({"id": order_id, **error})
+                    continue
+
+            if going_to_shipped or leaving_shipped:
+                sign = -1 if going_to_shipped else 1
+                for pin_id, quantity in needed.items():
+                    pin = pin_map.get(pin_id)
+                    if pin:  # pin retiré du catalogue : rien à restituer
+                        pin["stock"] = int(pin.get("stock", 0)) + sign * quantity
+                        stock_changed = True
+
+            removed.append(order_contribution(order))
+            added.append(order_contribution(order, new_status))
+            order.status = new_status
+            updated.append(order_id)
+
+        apply_orders(removed, -1)
+        apply_orders(added, 1)
+        if stock_changed:
+            routes_pins.save_pins(pins)  # commite aussi les statuts et les agrégats
+        else:
+            db.session.commit()
+
+    return jsonify({
+        "ok": not failures,
+        "status": new_status,
+        "updated": updated,
+        "skipped": skipped,  # déjà au statut demandé
+        "failed": failures,
+    })
+
+
+@bp_admin_orders.route("/api/admin/orders/<uuid:order_id>", methods=["DELETE"])
 @login_required
 def delete_order(order_id):
     if not is_admin():
         return jsonify({"error": "Unauthorized"}), 403
 
-    order = Order.query.get(order_id)
+    order = locked_order(order_id)
     if not order:
         return jsonify({"error": "Commande introuvable"}), 404
 
+    apply_order(order_contribution(order), -1)
     db.session.delete(order)
     db.session.commit()
     return jsonify({"ok": True})
@@ -321,57 +520,39 @@ def create_order():
     if not items:
         return jsonify({"error": "Le panier est vide"}), 400
 
-    pins_snapshot = read_pins()
-    pin_map = {p.get("id"): p for p in pins_snapshot}
-
-    sanitized_items = []
-    for it in items:
-        try:
-            pin_id = int(it.get("id"))
-            quantity = int(it.get("quantity", 1))
-            price = float(it.get("price"))
-        except (TypeError, ValueError):
-            return jsonify({"error": "Article invalide"}), 400
-
-        if quantity <= 0:
-            return jsonify({"error": "Quantité invalide"}), 400
-
-        pin = pin_map.get(pin_id)
-        if not pin:
-            return jsonify({"error": f"Article introuvable (id {pin_id})"}), 404
-
-        current_stock = int(pin.get("stock", 0))
-        if quantity > current_stock:
-            title = pin.get("title") or it.get("title") or "cet article"
-            return jsonify({
-                "error": f"Stock insuffisant pour {title}",
-                "available": current_stock,
-                "requested": quantity,
-            }), 400
-
-        sanitized_items.append((str(pin_id), it.get("title", pin.get("title", "")), price, quantity))
+    # prix et stock du catalogue, jamais ceux envoyés par le client
+    result = validate_cart(items)
+    if result["problems"]:
+        first = result["problems"][0]
+        status = 400 if any(p["code"] == "invalid" for p in result["problems"]) else 409
+        return jsonify({"error": first["message"], **result}), status
 
     order = Order(user_id=current_user.id)
     db.session.add(order)
-    db.session.flush()
 
-    for pin_id, title, price, quantity in sanitized_items:
-        order_item = OrderItem(
-            order_id=order.id,
-            pin_id=pin_id,
-            title=title,
-            price=price,
-            quantity=quantity
-        )
-        db.session.add(order_item)
+    for line in result["items"]:
+        order.items.append(OrderItem(
+            pin_id=str(line["id"]),
+            title=line["title"],
+            price=line["price"],
+            quantity=line["quantity"]
+        ))
 
+    db.session.flush()
+    apply_order(order_contribution(order), 1)
     db.session.commit()
     return jsonify({"ok": True, "order_id": order.id})
 
 @bp_orders.route("/api/orders", methods=["GET"])
 @login_required
 def list_user_orders():
-    orders = Order.query.filter_by(user_id=current_user.id).order_by(Order.created_at.desc()).all()
+    orders = (
+        Order.query
+        .options(selectinload(Order.items))
+        .filter_by(user_id=current_user.id)
+        .order_by(Order.created_at.desc())
+        .all()
+    )
     data = []
     for o in orders:
         data.append({
@@ -384,26 +565,27 @@ def list_user_orders():
 
 # --- DELETE supprimer commande ---
 
-@bp_orders.route("/api/orders/<int:order_id>", methods=["DELETE"])
+@bp_orders.route("/api/orders/<uuid:order_id>", methods=["DELETE"])
 @login_required
 def delete_user_order(order_id):
-    order = Order.query.get(order_id)
+    order = locked_order(order_id)
     if not order or order.user_id != current_user.id:
         return jsonify({"error": "Commande introuvable"}), 404
 
     if order.status != "en attente":
         return jsonify({"error": "Impossible de supprimer une commande validée"}), 400
 
+    apply_order(order_contribution(order), -1)
     db.session.delete(order)
     db.session.commit()
     return jsonify({"ok": True})
 
 # --- PATCH modifier commande ---
 
-@bp_orders.route("/api/orders/<int:order_id>", methods=["PATCH"])
+@bp_orders.route("/api/orders/<uuid:order_id>", methods=["PATCH"])
 @login_required
 def update_user_order(order_id):
-    order = Order.query.get(order_id)
+    order = locked_order(order_id)
     if not order or order.user_id != current_user.id:
         return jsonify({"error": "Commande introuvable"}), 404
 
@@ -412,10 +594,13 @@ def update_user_order(order_id):
 
     data = request.get_json()
     items = data.get("items", [])
+    before = order_contribution(order)
     for it in items:
         order_item = next((i for i in order.items if i.title == it["title"]), None)
         if order_item:
             order_item.quantity = int(it.get("quantity", order_item.quantity))
 
+    apply_order(before, -1)
+    apply_order(order_contribution(order), 1)
     db.session.commit()
     return jsonify({"ok": True})
@@ -2,12 +2,15 @@ import uuid
 from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify, current_app, url_for
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_mail import Message
 
 
-from .extensions import db, mail
+from .extensions import db
+from .mail_outbox import queue_mail
 from .models import User, Role
+from .passwords import hash_password, verify_password, needs_rehash, hash_token
+from .ratelimit import limiter, by_ip, by_account
+from .user_cache import invalidate_user
+from .http_cache import conditional
 
 bp_auth = Blueprint("auth", __name__)
 
@@ -15,6 +18,7 @@ bp_auth = Blueprint("auth", __name__)
 
 # -------------------- LOGIN --------------------
 @bp_auth.route("/api/auth/login", methods=["POST"])
+@limiter.limit("login", ip=by_ip, account=by_account)
 def login():
     try:
         data = request.get_json(silent=True) or {}
@@ -32,9 +36,14 @@ def login():
         if user and not user.is_active:
             return jsonify({"error": "Compte non activé. Vérifie ton email."}), 403
 
-        if not user or not check_password_hash(user.password_hash, password):
+        if not user or not verify_password(user.password_hash, password):
             return jsonify({"error": "Identifiants invalides"}), 401
 
+        # hash produit avec d'anciens paramètres : on le met à jour tant qu'on a le mot de passe en clair
+        if needs_rehash(user.password_hash):
+            user.password_hash = hash_password(password)
+            db.session.commit()
+
         login_user(user)
         return jsonify({"ok": True, "user": {
             "email": user.email or "",
@@ -55,6 +64,7 @@ def logout():
 # -------------------- CURRENT USER --------------------
 @bp_auth.route("/api/me", methods=["GET"])
 @login_required
+@conditional(lambda: (current_user.member_id, current_user.email, current_user.role.value), private=True)
 def me():
     identifiant = current_user.member_id or current_user.email
     return jsonify({
@@ -67,6 +77,7 @@ def me():
 
 @bp_auth.route("/api/me/info", methods=["GET", "PATCH"])
 @login_required
+@conditional(lambda: (current_user.nom, current_user.prenom, current_user.email, current_user.member_id), private=True)
 def me_info():
     if request.method == "GET":
         identifiant = current_user.member_id or current_user.email
@@ -79,16 +90,20 @@ def me_info():
         })
     elif request.method == "PATCH":
         data = request.get_json()
-        current_user.nom = data.get("nom", current_user.nom)
-        current_user.prenom = data.get("prenom", current_user.prenom)
-        current_user.email = data.get("email", current_user.email)
+        # current_user est un instantané en cache : on écrit sur la vraie ligne
+        user = User.query.get(current_user.id)
+        user.nom = data.get("nom", user.nom)
+        user.prenom = data.get("prenom", user.prenom)
+        user.email = data.get("email", user.email)
         db.session.commit()
+        invalidate_user(user.id)
         return jsonify({"success": True})
 
 
 
 # -------------------- REGISTER --------------------
 @bp_auth.route("/api/auth/register", methods=["POST"])
+@limiter.limit("register", ip=by_ip, account=by_account)
 def register():
     try:
         data = request.get_json(silent=True) or {}
@@ -111,24 +126,24 @@ def register():
             email=email,
             nom=nom,
             prenom=prenom,
-            password_hash=generate_password_hash(password),
+            password_hash=hash_password(password),
             role=Role.MEMBER,
             is_active=False,
-            activation_token=activation_token,
+            activation_token_hash=hash_token(activation_token),
             activation_token_expiry=activation_expiry
         )
         db.session.add(user)
-        db.session.commit()
 
+        # mail écrit dans la même transaction que le user, envoyé après le commit
         activation_link = f"https://cap.fede.fpms.ac.be/activation?token={activation_token}"
-        msg = Message(
+        queue_mail(
             subject="Confirme ton inscription",
             recipients=[user.email],
             html=f"Bonjour {user.prenom},<br><br>"
                 f"Clique sur ce lien pour activer ton compte (valable 24h) : "
                 f"<a href='{activation_link}'>Activer mon compte</a>"
         )
-        mail.send(msg)
+        db.session.commit()
 
         return jsonify({"ok": True, "message": "Un email d'activation a été envoyé à ton adresse."})
     except Exception as e:
@@ -138,14 +153,14 @@ def register():
 # -------------------- ACTIVATE ACCOUNT --------------------
 @bp_auth.route("/api/auth/activate/<token>", methods=["GET"])
 def activate(token):
-    user = User.query.filter_by(activation_token=token).first()
+    user = User.query.filter_by(activation_token_hash=hash_token(token)).first()
     if not user:
         return jsonify({"error": "Token invalide"}), 400
     if user.activation_token_expiry < datetime.utcnow():
         return jsonify({"error": "Token expiré"}), 400
 
     user.is_active = True
-    user.activation_token = None
+    user.activation_token_hash = None
     user.activation_token_expiry = None
     db.session.commit()
     return jsonify({"ok": True, "message": "Compte activé ! Tu peux maintenant te connecter."})
@@ -161,11 +176,13 @@ def change_password():
     if not old_password or not new_password or len(new_password) < 8:
         return jsonify({"error": "Champs invalides ou mot de passe trop court"}), 400
 
-    if not check_password_hash(current_user.password_hash, old_password):
+    user = User.query.get(current_user.id)
+    if not verify_password(user.password_hash, old_password):
         return jsonify({"error": "Ancien mot de passe incorrect"}), 403
 
-    current_user.password_hash = generate_password_hash(new_password)
+    user.password_hash = hash_password(new_password)
     db.session.commit()
+    invalidate_user(user.id)
     return jsonify({"ok": True})
 # -------------------- PASSWORD RESET REQUEST --------------------
 @bp_auth.route("/api/auth/reset-password/<token>", methods=["POST"])
@@ -177,14 +194,14 @@ def reset_password(token):
         if not new_password:
             return jsonify({"error": "Mot de passe requis"}), 400
 
-        user = User.query.filter_by(reset_token=token).first()
+        user = User.query.filter_by(reset_token_hash=hash_token(token)).first()
 
         if not user or not user.reset_token_expiry or user.reset_token_expiry < datetime.utcnow():
             return jsonify({"error": "Lien invalide ou expiré"}), 400
 
         # Mise à jour du mot de passe
-        user.password_hash = generate_password_hash(new_password)
-        user.reset_token = None
+        user.password_hash = hash_password(new_password)
+        user.reset_token_hash = None
         user.reset_token_expiry = None
         db.session.commit()
 
@@ -196,6 +213,7 @@ def reset_password(token):
 
 
 @bp_auth.route("/api/auth/request-password-reset", methods=["POST"])
+@limiter.limit("password_reset", ip=by_ip, account=by_account)
 def request_password_reset():
     try:
         data = request.get_json(silent=True) or {}
@@ -211,16 +229,14 @@ def request_password_reset():
             reset_token = str(uuid.uuid4())
             reset_expiry = datetime.utcnow() + timedelta(hours=1)
 
-            # Sauvegarde dans la DB
-            user.reset_token = reset_token
+            user.reset_token_hash = hash_token(reset_token)
             user.reset_token_expiry = reset_expiry
-            db.session.commit()
 
             # Création du lien vers ta page front (Astro/React)
             reset_link = f"https://cap.fede.fpms.ac.be/reset-password?token={reset_token}"
 
-            # Email
-            msg = Message(
+            # Email (boîte d'envoi, même transaction que le token)
+            queue_mail(
                 subject="Réinitialisation de ton mot de passe",
                 recipients=[user.email],
                 html=f"""
@@ -229,7 +245,9 @@ def request_password_reset():
                     <a href="{reset_link}">{reset_link}</a>
                 """
             )
-            mail.send(msg)
+
+            # Sauvegarde dans la DB
+            db.session.commit()
 
         # On répond toujours "ok" pour ne pas divulguer si l’email existe ou non
         return jsonify({"ok": True, "message": "Si un compte existe avec cet email, un lien de réinitialisation a été envoyé."})
@@ -1,12 +1,16 @@
 from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
-from .models import db, Membership, User, Role
+from .models import db, Membership, User, Role, ScanLog, parse_uuid
+from .scan_log import scan_log
+from .http_cache import conditional
+from .versions import bump_version, get_version, memberships_key
 
 bp_mem = Blueprint("memberships", __name__)
 
 # ---------- Membres : consulter ses cartes ----------
 @bp_mem.route("/api/memberships", methods=["GET"])
 @login_required
+@conditional(lambda: get_version(memberships_key(current_user.id)), private=True)
 def my_memberships():
     rows = (
         Membership.query
@@ -62,7 +66,7 @@ def parse_year_range_to_start(raw: str) -> int:
 
 
 # ---------- Admin : lister / créer / mettre à jour une carte ----------
-@bp_mem.route("/api/admin/users/<user_id>/annees", methods=["GET", "PUT"])
+@bp_mem.route("/api/admin/users/<uuid:user_id>/annees", methods=["GET", "PUT"])
 @login_required
 def upsert_or_list_year(user_id):
     # admin only
@@ -107,12 +111,13 @@ def upsert_or_list_year(user_id):
         row = Membership(user_id=u.id, annee=annee_start, annee_code=code)
         db.session.add(row)
 
+    bump_version(memberships_key(u.id))
     db.session.commit()
     return jsonify({"ok": True, "id": row.id})
 
 
 # ---------- Admin : suppression d’une carte ----------
-@bp_mem.route("/api/admin/users/<user_id>/annees/<int:annee>", methods=["DELETE"])
+@bp_mem.route("/api/admin/users/<uuid:user_id>/annees/<int:annee>", methods=["DELETE"])
 @login_required
 def delete_year_card(user_id, annee):
     # admin only
@@ -127,14 +132,15 @@ def delete_year_card(user_id, annee):
         return jsonify({"error": "Carte introuvable pour cette année"}), 404
 
     db.session.delete(row)
+    bump_version(memberships_key(user_id))
     db.session.commit()
     return jsonify({"ok": True})
 
 # --- QR code: génération & vérification ---
-from flask import current_app, send_file
+from flask import Response, current_app, send_file
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from datetime import datetime
 import io
-import qrcode
 
 def _qr_serializer():
     # token signé avec la SECRET_KEY
@@ -148,6 +154,20 @@ def _abs_host():
     base = request.host_url  # ex: 'http://localhost/'
     return base
 
+def _verify_url(s, row):
+    payload = {
+        "uid": row.user_id,
+        "annee": row.annee,
+        "annee_code": row.annee_code,
+    }
+    # token valable 400 jours (exemple)
+    token = s.dumps(payload)
+    return _abs_host().rstrip("/") + "/verify?token=" + token
+
+def _card_sort_key(code):
+    prefix, _, num = code.partition("-")
+    return (prefix, int(num) if num.isdigit() else 0)
+
 @bp_mem.route("/api/qr/<int:annee>.png", methods=["GET"])
 @login_required
 def qr_png_for_year(annee: int):
@@ -160,16 +180,9 @@ def qr_png_for_year(annee: int):
     if not row:
         return jsonify({"error": "Aucune carte pour cette année"}), 404
 
-    s = _qr_serializer()
-    payload = {
-        "uid": current_user.id,
-        "annee": row.annee,
-        "annee_code": row.annee_code,
-    }
-    # token valable 400 jours (exemple)
-    token = s.dumps(payload)
+    import qrcode  # PIL : chargé à la première génération, pas au démarrage
 
-    verify_url = _abs_host().rstrip("/") + "/verify?token=" + token
+    verify_url = _verify_url(_qr_serializer(), row)
     # génère le QR PNG
     img = qrcode.make(verify_url)
     buf = io.BytesIO()
@@ -177,41 +190,86 @@ def qr_png_for_year(annee: int):
     buf.seek(0)
     return send_file(buf, mimetype="image/png")
 
-@bp_mem.route("/api/verify", methods=["GET"])
-def api_verify():
-    """API JSON: ?token=... -> {valid:bool, ...}"""
-    token = request.args.get("token", "").strip()
+def _verify_token(token):
+    """Retourne (payload, status, membership) pour un token de QR."""
     if not token:
-        return jsonify({"valid": False, "reason": "missing token"}), 400
+        return {"valid": False, "reason": "missing token"}, 400, None
 
     s = _qr_serializer()
     try:
         data = s.loads(token, max_age=400*24*3600)  # même TTL que génération
     except SignatureExpired:
-        return jsonify({"valid": False, "reason": "expired"}), 400
+        return {"valid": False, "reason": "expired"}, 400, None
     except BadSignature:
-        return jsonify({"valid": False, "reason": "bad-signature"}), 400
+        return {"valid": False, "reason": "bad-signature"}, 400, None
 
     # RE-vérifier en DB que la carte est toujours valide et correspond
-    u = User.query.get(data.get("uid"))
+    uid = parse_uuid(data.get("uid"))
+    u = User.query.get(uid) if uid else None
     if not u:
-        return jsonify({"valid": False, "reason": "user-not-found"}), 404
+        return {"valid": False, "reason": "user-not-found"}, 404, None
 
     row = Membership.query.filter_by(user_id=u.id, annee=data.get("annee")).first()
     if not row:
-        return jsonify({"valid": False, "reason": "card-not-found"}), 404
+        return {"valid": False, "reason": "card-not-found"}, 404, None
 
     if row.annee_code != data.get("annee_code"):
-        return jsonify({"valid": False, "reason": "code-mismatch"}), 400
+        return {"valid": False, "reason": "code-mismatch"}, 400, row
 
     # OK
-    return jsonify({
+    return {
         "valid": True,
         "user": {"nom": u.nom, "prenom": u.prenom},
         "annee": row.annee,
         "periode": f"{row.annee}-{row.annee+1}",
         "code": row.annee_code
-    })
+    }, 200, row
+
+@bp_mem.route("/api/admin/qr/<int:annee>.pdf", methods=["GET"])
+@login_required
+def qr_sheet_for_year(annee: int):
+    """Planche PDF des QR de toutes les cartes d'une année (impression)."""
+    if getattr(current_user, "role", None) != Role.ADMIN:
+        return jsonify({"error": "Forbidden"}), 403
+    from . import qr_sheet  # qrcode + PIL
+
+    rows = (
+        db.session.query(Membership, User.nom, User.prenom)
+        .join(User, User.id == Membership.user_id)
+        .filter(Membership.annee == annee)
+        .all()
+    )
+    if not rows:
+        return jsonify({"error": "Aucune carte pour cette année"}), 404
+    rows.sort(key=lambda r: _card_sort_key(r[0].annee_code))
+
+    s = _qr_serializer()
+    cards = [
+        (_verify_url(s, m), f"{prenom} {nom} - {m.annee_code}")
+        for m, nom, prenom in rows
+    ]
+
+    # envoyé page par page pendant le rendu, rien n'est gardé en RAM ni sur disque
+    return Response(
+        qr_sheet.iter_pdf(cards, workers=current_app.config.get("QR_SHEET_WORKERS")),
+        mimetype="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename=cartes-{annee}-{annee+1}.pdf"},
+    )
+
+@bp_mem.route("/api/verify", methods=["GET"])
+def api_verify():
+    """API JSON: ?token=... -> {valid:bool, ...}"""
+    token = request.args.get("token", "").strip()
+    payload, status, row = _verify_token(token)
+
+    # journal des scans : simple ajout en mémoire, écrit en DB par lots
+    scan_log.record(
+        valid=payload["valid"],
+        reason="ok" if payload["valid"] else payload["reason"],
+        annee=row.annee if row else None,
+        user_id=row.user_id if row else None,
+    )
+    return jsonify(payload), status
 
 @bp_mem.route("/verify", methods=["GET"])
 def human_verify_page():
@@ -240,3 +298,51 @@ def human_verify_page():
 <h1>Carte invalide ❌</h1>
 <p>Raison : {j.get('reason','unknown')}</p>
 """, 400
+
+
+# ---------- Admin : statistiques de scans ----------
+def _hour_bucket(column):
+    if db.session.get_bind().dialect.name == "sqlite":
+        return db.func.strftime("%Y-%m-%d %H:00:00", column)
+    return db.func.date_trunc("hour", column)
+
+@bp_mem.route("/api/admin/scans/stats", methods=["GET"])
+@login_required
+def scan_stats():
+    """Nombre de scans par heure et par raison (?annee=, ?from=, ?to= en ISO)."""
+    if getattr(current_user, "role", None) != Role.ADMIN:
+        return jsonify({"error": "Forbidden"}), 403
+
+    # les derniers scans sont peut-être encore dans le tampon
+    scan_log.flush()
+
+    try:
+        start = datetime.fromisoformat(request.args["from"]) if request.args.get("from") else None
+        end = datetime.fromisoformat(request.args["to"]) if request.args.get("to") else None
+    except ValueError:
+        return jsonify({"error": "Date invalide (format ISO attendu)"}), 400
+
+    hour = _hour_bucket(ScanLog.scanned_at).label("hour")
+    q = db.session.query(hour, ScanLog.reason, db.func.count(ScanLog.id))
+    if request.args.get("annee"):
+        try:
+            q = q.filter(ScanLog.annee == parse_year_range_to_start(request.args["annee"]))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    if start:
+        q = q.filter(ScanLog.scanned_at >= start)
+    if end:
+        q = q.filter(ScanLog.scanned_at < end)
+    rows = q.group_by(hour, ScanLog.reason).order_by(hour).all()
+
+    hours = {}
+    totals = {}
+    for h, reason, count in rows:
+        key = h.isoformat() if isinstance(h, datetime) else str(h)
+        hours.setdefault(key, {})[reason] = count
+        totals[reason] = totals.get(reason, 0) + count
+
+    return jsonify({
+        "hours": [{"hour": k, "counts": v} for k, v in hours.items()],
+        "totals": totals,
+    })
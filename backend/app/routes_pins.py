@@ -1,31 +1,133 @@
-from flask import Blueprint, request, jsonify
-import os, json, time
+from flask import Blueprint, request, jsonify, current_app
+import os, json, time, bisect, threading
+
+from .extensions import db
+from .json_store import read_json, write_json, data_path, file_version, locked
+from .compression import compression
+from .http_cache import conditional
+from .invalidation import bus
+from .versions import bump_version, CATALOG_KEY
 
 bp_pins = Blueprint("pins", __name__, url_prefix="/api/pins")
 
 DATA_FILE = "pins.json"
-UPLOAD_FOLDER = "/app/frontend/public/uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# pins supprimés : {"floor": version, "deleted": [{"id", "version"}]}
+TOMBSTONES_FILE = "pins_deleted.json"
+TOMBSTONES_MAX = 1000
 
 
 def read_pins():
-    if not os.path.exists(DATA_FILE):
-        return []
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return read_json(data_path(DATA_FILE))
+
+
+def _content(pin):
+    return {k: v for k, v in pin.items() if k != "version"}
 
 
 def save_pins(pins):
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(pins, f, indent=2, ensure_ascii=False)
+    """Écrit le catalogue. Chaque pin ajouté ou modifié reçoit la nouvelle
+    version du catalogue (compteur resource_version "catalog"), chaque pin
+    retiré une pierre tombale : /api/pins/changes s'appuie dessus.
+    À appeler hors transaction en cours (le compteur est commité ici) ; pour
+    une lecture-modification-écriture, lire le catalogue sous
+    `locked(data_path(DATA_FILE))`."""
+    # lecture, version et écriture sous le même verrou : deux workers ne
+    # peuvent pas écrire dans l'ordre inverse de leurs versions
+    with locked(data_path(DATA_FILE)):
+        previous = {p["id"]: p for p in read_pins()}
+        changed = []
+        for pin in pins:
+            old = previous.pop(pin["id"], None)
+            if old is None or _content(old) != _content(pin):
+                changed.append(pin)
+            else:
+                pin["version"] = old.get("version", 0)
+
+        if changed or previous:
+            version = bump_version(CATALOG_KEY)
+            db.session.commit()
+            for pin in changed:
+                pin["version"] = version
+            if previous:
+                tombstones = read_json(data_path(TOMBSTONES_FILE), {"floor": 0, "deleted": []})
+                tombstones["deleted"] += [{"id": pin_id, "version": version} for pin_id in previous]
+                if len(tombstones["deleted"]) > TOMBSTONES_MAX:
+                    dropped = tombstones["deleted"][:-TOMBSTONES_MAX]
+                    tombstones["floor"] = dropped[-1]["version"]
+                    tombstones["deleted"] = tombstones["deleted"][-TOMBSTONES_MAX:]
+                write_json(data_path(TOMBSTONES_FILE), tombstones)
+
+        write_json(data_path(DATA_FILE), pins)
+    bus.publish("catalog")
+
+
+# ---------- Index des changements (par process) ----------
+class CatalogIndex:
+    """Pins et pierres tombales triés par version, reconstruits quand les
+    fichiers changent : un appel à /changes ne relit pas le catalogue."""
+
+    def __init__(self, state, pins, tombstones):
+        self.state = state
+        self.pins = sorted(pins, key=lambda p: p.get("version", 0))
+        self.pin_versions = [p.get("version", 0) for p in self.pins]
+        live = {p["id"] for p in pins}
+        self.deleted = [t for t in tombstones["deleted"] if t["id"] not in live]
+        self.deleted_versions = [t["version"] for t in self.deleted]
+        self.floor = tombstones["floor"]
+        # version réellement contenue dans les fichiers (pas le compteur en base,
+        # qui peut précéder l'écriture du fichier par un autre worker)
+        self.version = max(self.pin_versions[-1:] + self.deleted_versions[-1:] + [self.floor])
+
+    def changes(self, since):
+        return (
+            self.pins[bisect.bisect_right(self.pin_versions, since):],
+            [t["id"] for t in self.deleted[bisect.bisect_right(self.deleted_versions, since):]],
+        )
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def catalog_index():
+    global _index
+    state = (file_version(data_path(DATA_FILE)), file_version(data_path(TOMBSTONES_FILE)))
+    index = _index
+    if index is None or index.state != state:
+        index = CatalogIndex(state, read_pins(), read_json(data_path(TOMBSTONES_FILE), {"floor": 0, "deleted": []}))
+        with _index_lock:
+            _index = index
+    return index
 
 
 # --- Routes Blueprint ---
 @bp_pins.get("/")
+@conditional(lambda: file_version(data_path(DATA_FILE)))
+@compression.cached(lambda: file_version(data_path(DATA_FILE)), channel="catalog")
 def get_pins():
     return jsonify(read_pins())
 
 
+@bp_pins.get("/changes")
+def get_changes():
+    """Pins modifiés et supprimés depuis `since`.
+
+    Le client part de la liste complète (GET /api/pins/) avec
+    since = max(pin.version), applique `deleted` puis `changed`, et garde
+    `version` pour l'appel suivant. reset=true : l'historique ne remonte pas
+    jusqu'à `since`, recharger la liste complète.
+    """
+    since = request.args.get("since", type=int)
+    if since is None or since < 0:
+        return jsonify({"error": "Paramètre since invalide"}), 400
+
+    index = catalog_index()
+    if since > index.version or since < index.floor:
+        return jsonify({"version": index.version, "reset": True, "changed": [], "deleted": []})
+    changed, deleted = index.changes(since)
+    return jsonify({"version": index.version, "reset": False, "changed": changed, "deleted": deleted})
+
+
 @bp_pins.post("/")
 def add_pin():
     title = request.form.get("title")
@@ -39,10 +141,9 @@ def add_pin():
         return jsonify({"error": "Missing fields"}), 400
 
     filename = f"{int(time.time())}-{image.filename}"
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
+    filepath = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
     image.save(filepath)
 
-    pins = read_pins()
     new_pin = {
         "id": int(time.time()),
         "title": title,
@@ -52,39 +153,42 @@ def add_pin():
         "stock": int(stock),  # ✅ ajouté
         "category" : category
     }
-    pins.append(new_pin)
-    save_pins(pins)
+    with locked(data_path(DATA_FILE)):  # lecture et écriture sous le même verrou
+        pins = read_pins()
+        pins.append(new_pin)
+        save_pins(pins)
 
     return jsonify(new_pin), 201
 
 
 @bp_pins.put("/<int:pin_id>")
 def update_pin(pin_id):
-    pins = read_pins()
-    pin = next((p for p in pins if p["id"] == pin_id), None)
-    if not pin:
-        return jsonify({"error": "Pin not found"}), 404
-
-    title = request.form.get("title", pin["title"])
-    price = request.form.get("price", pin["price"])
-    description = request.form.get("description", pin["description"])
-    stock = request.form.get("stock", pin.get("stock", 0))
-    category = request.form.get("category", pin.get("category", "Autre"))
-    image = request.files.get("image")
-
-    if image:
-        filename = f"{int(time.time())}-{image.filename}"
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        image.save(filepath)
-        pin["imageUrl"] = f"/uploads/{filename}"
-
-    pin["title"] = title
-    pin["price"] = price
-    pin["description"] = description
-    pin["stock"] = int(stock)
-    pin["category"] = category   # ✅ ajouté
-
-    save_pins(pins)
+    with locked(data_path(DATA_FILE)):  # lecture et écriture sous le même verrou
+        pins = read_pins()
+        pin = next((p for p in pins if p["id"] == pin_id), None)
+        if not pin:
+            return jsonify({"error": "Pin not found"}), 404
+
+        title = request.form.get("title", pin["title"])
+        price = request.form.get("price", pin["price"])
+        description = request.form.get("description", pin["description"])
+        stock = request.form.get("stock", pin.get("stock", 0))
+        category = request.form.get("category", pin.get("category", "Autre"))
+        image = request.files.get("image")
+
+        if image:
+            filename = f"{int(time.time())}-{image.filename}"
+            filepath = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
+            image.save(filepath)
+            pin["imageUrl"] = f"/uploads/{filename}"
+
+        pin["title"] = title
+        pin["price"] = price
+        pin["description"] = description
+        pin["stock"] = int(stock)
+        pin["category"] = category   # ✅ ajouté
+
+        save_pins(pins)
     return jsonify(pin)
 
 
@@ -92,35 +196,36 @@ def update_pin(pin_id):
 @bp_pins.patch("/<int:pin_id>/stock")
 def update_stock(pin_id):
     """Route rapide pour mettre à jour uniquement le stock"""
-    pins = read_pins()
-    pin = next((p for p in pins if p["id"] == pin_id), None)
-    if not pin:
-        return jsonify({"error": "Pin not found"}), 404
-
     data = request.get_json(silent=True) or {}
     stock = data.get("stock")
     if stock is None:
         return jsonify({"error": "Missing stock"}), 400
 
-    pin["stock"] = int(stock)
-    save_pins(pins)
+    with locked(data_path(DATA_FILE)):  # pas d'écrasement des deltas des commandes
+        pins = read_pins()
+        pin = next((p for p in pins if p["id"] == pin_id), None)
+        if not pin:
+            return jsonify({"error": "Pin not found"}), 404
+        pin["stock"] = int(stock)
+        save_pins(pins)
     return jsonify({"success": True, "id": pin_id, "stock": pin["stock"]})
 
 
 @bp_pins.delete("/<int:pin_id>")
 def delete_pin(pin_id):
-    pins = read_pins()
-    pin = next((p for p in pins if p["id"] == pin_id), None)
-    if not pin:
-        return jsonify({"error": "Pin not found"}), 404
+    with locked(data_path(DATA_FILE)):  # lecture et écriture sous le même verrou
+        pins = read_pins()
+        pin = next((p for p in pins if p["id"] == pin_id), None)
+        if not pin:
+            return jsonify({"error": "Pin not found"}), 404
+
+        pins = [p for p in pins if p["id"] != pin_id]
+        save_pins(pins)
 
     if "imageUrl" in pin:
         filename = os.path.basename(pin["imageUrl"])
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
+        filepath = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
         if os.path.exists(filepath):
             os.remove(filepath)
 
-    pins = [p for p in pins if p["id"] != pin_id]
-    save_pins(pins)
-
     return jsonify({"success": True, "deleted_id": pin_id})
\ No newline at end of file
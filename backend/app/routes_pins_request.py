@@ -1,26 +1,21 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
 import os, json, time
 from .models import Role
+from .json_store import read_json, write_json, data_path
 
 
 bp_requests = Blueprint("pins_requests", __name__, url_prefix="/api/pins/requests")
 
 DATA_FILE = "pins_requests.json"
-UPLOAD_FOLDER = "/app/frontend/public/uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 
 def read_requests():
-    if not os.path.exists(DATA_FILE):
-        return []
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return read_json(data_path(DATA_FILE))
 
 
 def save_requests(requests):
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(requests, f, indent=2, ensure_ascii=False)
+    write_json(data_path(DATA_FILE), requests)
 
 
 @bp_requests.get("/")
@@ -54,7 +49,7 @@ def add_request():
         return jsonify({"error": "Missing fields"}), 400
 
     filename = f"{int(time.time())}-{logo.filename}"
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
+    filepath = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
     logo.save(filepath)
 
     requests = read_requests()
@@ -107,7 +102,7 @@ def delete_request(req_id):
     # supprimer le logo uploadé
     if "logoUrl" in req:
         filename = os.path.basename(req["logoUrl"])
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
+        filepath = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
         if os.path.exists(filepath):
             os.remove(filepath)
 
@@ -0,0 +1,108 @@
+# app/scan_log.py
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from .extensions import ForkSafeThread, db
+from .models import ScanLog
+
+logger = logging.getLogger(__name__)
+
+
+class ScanLogBuffer(ForkSafeThread):
+    """Tampon en mémoire pour le journal des scans de /api/verify.
+
+    Les scans sont ajoutés sans toucher la DB ; un thread par worker vide le
+    tampon par INSERT multi-lignes dès que `batch_size` entrées attendent ou
+    toutes les `flush_interval` secondes. Si l'écriture échoue, les entrées
+    retournent dans le tampon pour le passage suivant ; si la DB ne suit pas,
+    les plus anciennes sont abandonnées (deque bornée).
+    """
+
+    thread_name = "scan-log-flusher"
+
+    def __init__(self):
+        super().__init__()
+        self.app = None
+        self.batch_size = 200
+        self.flush_interval = 5.0
+        self.dropped = 0
+        self._entries = deque(maxlen=10000)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = int(app.config.get("SCAN_LOG_BATCH_SIZE", 200))
+        self.flush_interval = float(app.config.get("SCAN_LOG_FLUSH_INTERVAL", 5.0))
+        self._entries = deque(maxlen=int(app.config.get("SCAN_LOG_MAX_PENDING", 10000)))
+        atexit.register(self.flush)
+
+    def record(self, valid, reason, annee=None, user_id=None):
+        entry = {
+            "scanned_at": datetime.utcnow(),
+            "valid": bool(valid),
+            "reason": reason,
+            "annee": annee if isinstance(annee, int) else None,
+            "user_id": user_id if isinstance(user_id, str) else None,
+        }
+        with self._lock:
+            if len(self._entries) == self._entries.maxlen:
+                self.dropped += 1  # la deque éjecte la plus ancienne
+            self._entries.append(entry)
+            pending = len(self._entries)
+
+        self.ensure_started()
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def flush(self):
+        """Écrit toutes les entrées en attente ; retourne le nombre inséré."""
+        if self.app is None:
+            return 0
+        with self._lock:
+            batch = list(self._entries)
+            self._entries.clear()
+        if not batch:
+            return 0
+
+        written = 0
+        with self.app.app_context():
+            try:
+                for start in range(0, len(batch), self.batch_size):
+                    chunk = batch[start:start + self.batch_size]
+                    db.session.execute(insert(ScanLog), chunk)
+                    written += len(chunk)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                lost = self._requeue(batch)
+                logger.exception("Scan log flush failed, %d entries requeued, %d dropped", len(batch) - lost, lost)
+                return 0
+            finally:
+                db.session.remove()
+        return written
+
+    def _requeue(self, batch):
+        """Remet `batch` en tête du tampon ; retourne le nombre d'entrées
+        abandonnées (les plus anciennes) si le tampon déborde."""
+        with self._lock:
+            entries = batch + list(self._entries)
+            lost = max(0, len(entries) - self._entries.maxlen)
+            self._entries.clear()
+            self._entries.extend(entries[lost:])
+            self.dropped += lost
+        return lost
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+scan_log = ScanLogBuffer()
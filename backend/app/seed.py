@@ -0,0 +1,258 @@
+# app/seed.py
+"""Jeu de données synthétique pour les tests de charge : `flask seed generate`.
+
+    flask seed generate --users 50000 --orders 500000 --pins 3000 --seed 42
+
+Génère des membres (cartes sur plusieurs années, codes uniques par année),
+des commandes avec articles, un catalogue de pins (images + catégories) et
+des demandes de pins / pennes. Tout est dérivé de --seed : deux exécutions
+avec les mêmes paramètres produisent les mêmes données, à une exception près :
+le hash du mot de passe commun (SEED_PASSWORD), salé aléatoirement, change
+d'une exécution à l'autre (il est calculé une fois et partagé par tous les
+membres d'une exécution). Les lignes sont insérées par COPY sous PostgreSQL,
+par executemany ailleurs, par lots de --batch-size. Les fichiers JSON (pins,
+catégories, demandes) sont remplacés via les fonctions d'écriture de chaque
+module : le catalogue reçoit une nouvelle version (/api/pins/changes) et les
+caches des workers sont invalidés.
+"""
+import csv
+import enum
+import io
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import click
+from flask import Blueprint, current_app
+
+from .extensions import db
+from .models import Role, User, Membership, Order, OrderItem
+from .passwords import hash_password
+
+bp_seed = Blueprint("seed", __name__, cli_group="seed")
+
+SEED_PASSWORD = "motdepasse"
+CARD_PREFIXES = ["A"] * 6 + ["F", "E", "EA", "MI", "S"]
+ORDER_STATUSES = ["en attente"] * 2 + ["validée"] * 3 + ["expédiée"] * 4 + ["annulée"]
+DEFAULT_CATEGORIES = ["Autre", "Lettres", "Chiffres", "Postes", "Cercles", "Etudes", "Passions", "Régions"]
+PIN_COLORS = ["#c0392b", "#2980b9", "#27ae60", "#f39c12", "#8e44ad", "#16a085", "#2c3e50", "#d35400"]
+
+
+class Generator:
+    def __init__(self, seed, years):
+        self.rng = random.Random(seed)
+        self.years = years
+
+    def uuid(self):
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def moment(self, year):
+        """Date dans l'année académique `year` (septembre -> août)."""
+        start = datetime(year, 9, 1)
+        return start + timedelta(seconds=self.rng.randrange(365 * 24 * 3600))
+
+    # ---------- Base ----------
+    def users(self, count):
+        # seul champ non reproductible : le sel est aléatoire (un hash par exécution)
+        password_hash = hash_password(SEED_PASSWORD)
+        for i in range(count):
+            kind = self.rng.random()
+            yield {
+                "id": self.uuid(),
+                "nom": f"Nom{i}",
+                "prenom": f"Prénom{i}",
+                "email": f"membre{i}@example.com",
+                "member_id": f"{100000 + i}" if kind < 0.3 and i < 900000 else None,
+                "password_hash": password_hash,
+                "role": Role.ADMIN if i == 0 else Role.VERIFIER if kind > 0.995 else Role.ATTENTE if kind > 0.97 else Role.MEMBER,
+                "is_active": kind <= 0.97 or i == 0,
+                "created_at": self.moment(self.rng.choice(self.years)),
+            }
+
+    def memberships(self, user_ids):
+        # compteur par (année, préfixe) : (annee, annee_code) reste unique
+        counters = {}
+        for user_id in user_ids:
+            first = self.rng.randrange(len(self.years))
+            span = self.rng.randint(1, 4)
+            for year in self.years[first:first + span]:
+                prefix = self.rng.choice(CARD_PREFIXES)
+                counters[(year, prefix)] = n = counters.get((year, prefix), 0) + 1
+                yield {"id": self.uuid(), "user_id": user_id, "annee": year, "annee_code": f"{prefix}-{n}"}
+
+    def orders(self, count, user_ids, pins):
+        """Génère des paires (commande, [articles])."""
+        for _ in range(count):
+            order_id = self.uuid()
+            order = {
+                "id": order_id,
+                "user_id": self.rng.choice(user_ids),
+                "status": self.rng.choice(ORDER_STATUSES),
+                "created_at": self.moment(self.rng.choice(self.years)),
+            }
+            items = [{
+                "id": self.uuid(),
+                "order_id": order_id,
+                "pin_id": str(pin["id"]),
+                "title": pin["title"],
+                "price": float(pin["price"]),
+                "quantity": self.rng.choices([1, 2, 3, 5], weights=[70, 20, 7, 3])[0],
+            } for pin in self.rng.sample(pins, k=min(len(pins), self.rng.randint(1, 4)))]
+            yield order, items
+
+    # ---------- Fichiers JSON ----------
+    def pins(self, count, categories):
+        return [{
+            "id": 1700000000 + i,
+            "title": f"Pin {i}",
+            "price": f"{self.rng.choice([1.5, 2, 2.5, 3, 4, 5]):.2f}",
+            "description": f"Pin généré n°{i}",
+            "imageUrl": f"/uploads/seed-pin-{i}.png",
+            "stock": self.rng.randint(0, 300),
+            "category": self.rng.choice(categories),
+        } for i in range(count)]
+
+    def pin_requests(self, count, users):
+        return [{
+            "id": 1700000000 + i,
+            "user_id": user["id"],
+            "user_nom": user["nom"],
+            "user_prenom": user["prenom"],
+            "title": f"Demande {i}",
+            "quantity": self.rng.randint(10, 200),
+            "notes": "",
+            "logoUrl": f"/uploads/seed-pin-{i % 50}.png",
+            "status": self.rng.choice(["en attente", "acceptée", "refusée"]),
+            "created_at": self.moment(self.rng.choice(self.years)).strftime("%Y-%m-%d %H:%M:%S"),
+        } for i, user in enumerate(self.rng.choices(users, k=count))]
+
+    def penne_requests(self, count, users):
+        return [{
+            "id": i + 1,
+            "user_id": user["id"],
+            "user_nom": user["nom"],
+            "user_prenom": user["prenom"],
+            "couleur": self.rng.choice(["bleu", "rouge", "vert", "noir", "blanc"]),
+            "liseré": self.rng.choice(["or", "argent", "aucun"]),
+            "broderie": f"Broderie {i}",
+            "tourDeTete": self.rng.randint(52, 62),
+            "status": self.rng.choice(["en attente", "acceptée", "refusée"]),
+        } for i, user in enumerate(self.rng.choices(users, k=count))]
+
+
+# ---------- Insertion ----------
+def _copy_value(value):
+    if isinstance(value, enum.Enum):
+        return value.name
+    return value
+
+
+def bulk_insert(model, rows, batch_size):
+    """Insère un itérable de dicts par lots (COPY sous PostgreSQL)."""
+    table = model.__table__
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _flush(table, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        _flush(table, batch)
+        total += len(batch)
+    return total
+
+
+def _flush(table, batch):
+    if db.session.get_bind().dialect.name != "postgresql":
+        db.session.execute(table.insert(), batch)
+        return
+    columns = list(batch[0])
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in batch:
+        writer.writerow([_copy_value(row[c]) for c in columns])
+    buf.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(
+        f'COPY "{table.name}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buf
+    )
+
+
+def _write_images(folder, count):
+    from PIL import Image
+
+    os.makedirs(folder, exist_ok=True)
+    for i in range(count):
+        color = PIN_COLORS[i % len(PIN_COLORS)]
+        Image.new("RGB", (64, 64), color).save(os.path.join(folder, f"seed-pin-{i}.png"))
+
+
+# ---------- Commande ----------
+@bp_seed.cli.command("generate")
+@click.option("--users", default=50000, show_default=True)
+@click.option("--orders", default=500000, show_default=True)
+@click.option("--pins", default=3000, show_default=True)
+@click.option("--pin-requests", default=2000, show_default=True)
+@click.option("--penne-requests", default=2000, show_default=True)
+@click.option("--years", default="2022-2025", show_default=True, help="Années académiques (début-fin)")
+@click.option("--seed", default=1, show_default=True)
+@click.option("--batch-size", default=10000, show_default=True)
+@click.option("--images/--no-images", default=True, help="Écrire une image PNG par pin")
+@click.option("--yes", is_flag=True, help="Ne pas demander de confirmation")
+def generate_command(users, orders, pins, pin_requests, penne_requests, years, seed, batch_size, images, yes):
+    """Remplit la base et les fichiers JSON avec des données synthétiques."""
+    from . import categories as categories_module, pennes, routes_pins, routes_pins_request
+    from .analytics import rebuild
+
+    first, _, last = years.partition("-")
+    year_list = list(range(int(first), int(last or first) + 1))
+
+    if db.session.query(User.id).first():
+        raise click.ClickException("La base contient déjà des utilisateurs : le générateur attend une base vide.")
+    if not yes:
+        click.confirm("Les fichiers JSON (pins, catégories, demandes) vont être remplacés. Continuer ?", abort=True)
+
+    gen = Generator(seed, year_list)
+
+    categories = DEFAULT_CATEGORIES
+    pin_rows = gen.pins(pins, categories)
+    routes_pins.save_pins(pin_rows)
+    categories_module.save_categories(categories)
+    if images:
+        _write_images(current_app.config["UPLOAD_FOLDER"], pins)
+    click.echo(f"{len(pin_rows)} pins, {len(categories)} catégories")
+
+    user_rows = list(gen.users(users))
+    bulk_insert(User, user_rows, batch_size)
+    user_ids = [u["id"] for u in user_rows]
+    count = bulk_insert(Membership, gen.memberships(user_ids), batch_size)
+    db.session.commit()
+    click.echo(f"{len(user_rows)} membres, {count} cartes")
+
+    done = 0
+    order_batch, item_batch = [], []
+    for order, items in gen.orders(orders, user_ids, pin_rows):
+        order_batch.append(order)
+        item_batch.extend(items)
+        if len(order_batch) >= batch_size:
+            bulk_insert(Order, order_batch, batch_size)
+            bulk_insert(OrderItem, item_batch, batch_size)
+            db.session.commit()
+            done += len(order_batch)
+            order_batch, item_batch = [], []
+            click.echo(f"  {done}/{orders} commandes")
+    if order_batch:
+        bulk_insert(Order, order_batch, batch_size)
+        bulk_insert(OrderItem, item_batch, batch_size)
+        db.session.commit()
+    click.echo(f"{orders} commandes")
+
+    routes_pins_request.save_requests(gen.pin_requests(pin_requests, user_rows))
+    pennes.save_penne_requests(gen.penne_requests(penne_requests, user_rows))
+    click.echo(f"{pin_requests} demandes de pins, {penne_requests} demandes de pennes")
+
+    rebuild()
+    click.echo("Agrégats de ventes recalculés.")
@@ -0,0 +1,173 @@
+# app/sql_profiler.py
+"""Profilage SQL par requête HTTP et détection des N+1 (opt-in : SQL_PROFILE=1).
+
+Pour chaque requête : nombre de requêtes SQL, temps passé en base et
+empreinte de chaque instruction (SQL paramétré, espaces normalisés). Si
+une même instruction est exécutée au moins SQL_PROFILE_REPEAT_THRESHOLD
+fois, un warning est loggé : c'est le signe d'un accès paresseux dans une
+boucle. Les en-têtes X-SQL-Queries / X-SQL-Time sont ajoutés à la réponse.
+
+`count_queries()` / `assert_max_queries(n)` comptent les requêtes d'un bloc,
+indépendamment de SQL_PROFILE, pour le thread (contexte) courant seulement :
+les threads de fond (journal des scans, outbox, bus d'invalidation) ne
+faussent pas le compte.
+
+    with assert_max_queries(3):
+        client.get("/api/admin/orders")
+
+Une seule paire d'écouteurs SQLAlchemy par engine, installée si SQL_PROFILE
+ou les métriques (metrics.py) sont actifs, ou le temps d'un bloc
+count_queries(). Elle alimente un QueryStats par requête HTTP (g._sql_stats),
+lu par le profileur comme par les métriques, et les observateurs de
+`sql_profiler.observers` (latence de chaque requête SQL). Sans profilage ni
+métriques, aucun coût par requête SQL.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+from .extensions import db
+
+logger = logging.getLogger(__name__)
+
+# compteurs actifs du contexte courant (un thread neuf part d'un contexte vide)
+_collectors = ContextVar("sql_collectors", default=())
+
+
+def fingerprint(statement):
+    statement = re.sub(r"\s+", " ", statement).strip()
+    # listes de paramètres de longueur variable : IN (?, ?, ?) -> IN (...)
+    return re.sub(r"\((?:\s*(?:\?|%\(\w+\)s|%s)\s*,?)+\)", "(...)", statement)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self._raw = Counter()  # empreintes calculées à la lecture seulement
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.time += elapsed
+        self._raw[statement] += 1
+
+    @property
+    def statements(self):
+        counts = Counter()
+        for statement, n in self._raw.items():
+            counts[fingerprint(statement)] += n
+        return counts
+
+    def repeated(self, threshold):
+        return [(stmt, n) for stmt, n in self.statements.most_common() if n >= threshold]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_profiler_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("_profiler_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = g.get("_sql_stats") if has_request_context() else None
+    if stats is not None:
+        stats.record(statement, elapsed)
+    for collector in _collectors.get():
+        collector.record(statement, elapsed)
+    for observe in sql_profiler.observers:
+        observe(elapsed)
+
+
+def _start_request_stats():
+    g._sql_stats = QueryStats()
+
+
+class SqlProfiler:
+    def __init__(self):
+        self.app = None
+        self.observers = []  # callbacks(elapsed) appelés pour chaque requête SQL
+        self._watchers = {}  # engine -> nombre d'utilisateurs (profilage, métriques, blocs count_queries)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.repeat_threshold = int(app.config.get("SQL_PROFILE_REPEAT_THRESHOLD", 5))
+        if not app.config.get("SQL_PROFILE"):
+            return
+        self.collect_requests(app)
+        app.after_request(self._after_request)
+
+    def collect_requests(self, app):
+        """Un QueryStats par requête HTTP dans g._sql_stats ; idempotent par app."""
+        if app.extensions.get("sql_request_stats"):
+            return
+        app.extensions["sql_request_stats"] = True
+        with app.app_context():
+            self.watch(db.engine)
+        app.before_request(_start_request_stats)
+
+    def engine(self):
+        if has_app_context():
+            return db.engine
+        with self.app.app_context():
+            return db.engine
+
+    def watch(self, engine):
+        with self._lock:
+            self._watchers[engine] = self._watchers.get(engine, 0) + 1
+            if self._watchers[engine] == 1:
+                event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+                event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    def unwatch(self, engine):
+        with self._lock:
+            self._watchers[engine] -= 1
+            if self._watchers[engine] == 0:
+                del self._watchers[engine]
+                event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+                event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+
+    def _after_request(self, response):
+        stats = g.get("_sql_stats")
+        if stats is None:
+            return response
+        response.headers["X-SQL-Queries"] = str(stats.count)
+        response.headers["X-SQL-Time"] = f"{stats.time * 1000:.1f}ms"
+        for statement, n in stats.repeated(self.repeat_threshold):
+            logger.warning("N+1 probable sur %s %s : %d x %s", request.method, request.path, n, statement[:300])
+        return response
+
+
+@contextmanager
+def count_queries():
+    """Compte les requêtes SQL exécutées dans le bloc par le contexte courant."""
+    stats = QueryStats()
+    engine = sql_profiler.engine()
+    sql_profiler.watch(engine)
+    token = _collectors.set(_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _collectors.reset(token)
+        sql_profiler.unwatch(engine)
+
+
+@contextmanager
+def assert_max_queries(limit):
+    with count_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        detail = "\n".join(f"  {n} x {stmt}" for stmt, n in stats.statements.most_common())
+        raise AssertionError(f"{stats.count} requêtes SQL (maximum {limit}) :\n{detail}")
+
+
+sql_profiler = SqlProfiler()
@@ -0,0 +1,95 @@
+# app/user_cache.py
+"""Cache par process de l'utilisateur de session (current_user).
+
+`load_user` est appelé à chaque requête authentifiée ; on garde pendant
+USER_CACHE_TTL secondes un instantané des seuls champs lus via current_user,
+ce qui évite un SELECT sur users pour la plupart des requêtes. Les routes
+qui modifient un compte appellent `invalidate_user` après le commit : l'entrée
+est retirée dans tous les workers (bus d'invalidation, canal "users") ;
+celles qui écrivent sur l'utilisateur connecté rechargent la ligne complète.
+"""
+import threading
+import time
+
+from flask import current_app
+from flask_login import UserMixin
+
+from .extensions import db
+from .invalidation import bus
+from .models import User, parse_uuid
+
+_cache = {}
+_lock = threading.Lock()
+
+
+class SessionUser(UserMixin):
+    """Instantané en lecture seule d'un User."""
+
+    def __init__(self, id, nom, prenom, email, member_id, role, is_active):
+        self.id = id
+        self.nom = nom
+        self.prenom = prenom
+        self.email = email
+        self.member_id = member_id
+        self.role = role
+        self._is_active = bool(is_active)
+
+    @property
+    def is_active(self):
+        return self._is_active
+
+
+def load_session_user(user_id):
+    user_id = parse_uuid(user_id)
+    if user_id is None:  # cookie invalide ou forgé
+        return None
+
+    ttl = float(current_app.config.get("USER_CACHE_TTL", 30))
+    now = time.monotonic()
+    entry = _cache.get(user_id)
+    if entry and entry[0] > now:
+        return entry[1]
+
+    row = (
+        db.session.query(User.id, User.nom, User.prenom, User.email, User.member_id, User.role, User.is_active)
+        .filter(User.id == user_id)
+        .first()
+    )
+    if not row:
+        _evict(user_id)
+        return None
+
+    user = SessionUser(*row)
+    if ttl > 0:
+        with _lock:
+            if len(_cache) >= int(current_app.config.get("USER_CACHE_MAX", 10000)):
+                _evict_expired(now)
+            _cache[user_id] = (now + ttl, user)
+    return user
+
+
+def invalidate_user(user_id):
+    bus.publish("users", user_id)
+
+
+def _evict(user_id):
+    with _lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(user_id, None)
+
+
+bus.subscribe("users", _evict)
+
+
+def clear():
+    with _lock:
+        _cache.clear()
+
+
+def _evict_expired(now):
+    for key in [k for k, (expires, _) in _cache.items() if expires <= now]:
+        del _cache[key]
+    if len(_cache) >= int(current_app.config.get("USER_CACHE_MAX", 10000)):
+        _cache.clear()
@@ -0,0 +1,36 @@
+# app/versions.py
+"""Compteurs de version par ressource (table resource_version).
+
+`bump_version(key)` s'appelle dans la transaction qui modifie la ressource :
+le compteur avance au commit, en même temps que les données, et se lit
+depuis n'importe quel worker. Clés utilisées :
+  - memberships:<user_id>   cartes d'un membre
+  - catalog                 catalogue des pins (version portée par chaque pin)
+"""
+from sqlalchemy import select
+
+from .extensions import db, upsert_insert
+from .models import ResourceVersion
+
+
+CATALOG_KEY = "catalog"
+
+
+def memberships_key(user_id):
+    return f"memberships:{user_id}"
+
+
+def bump_version(key):
+    """+1 sur le compteur (créé à 1), sans commit. Retourne la nouvelle version."""
+    table = ResourceVersion.__table__
+    stmt = upsert_insert(table).values(key=key, version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.key],
+        set_={"version": table.c.version + 1},
+    ).returning(table.c.version)
+    return db.session.execute(stmt).scalar_one()
+
+
+def get_version(key):
+    """Version courante (0 si la ressource n'a jamais été modifiée)."""
+    return db.session.execute(select(ResourceVersion.version).where(ResourceVersion.key == key)).scalar() or 0
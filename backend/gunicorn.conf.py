@@ -0,0 +1,78 @@
+# gunicorn.conf.py (lu automatiquement par gunicorn depuis le dossier courant)
+"""Profil de production : `gunicorn wsgi:app`.
+
+  - preload_app : l'application est importée une fois dans le master puis
+    partagée par fork (démarrage des workers quasi instantané)
+  - workers gthread : GUNICORN_THREADS requêtes par worker, un envoi SMTP ou
+    un upload lent ne bloque plus tout le worker
+  - pool SQLAlchemy dimensionné sur les threads : une connexion par thread
+    (+ quelques-unes pour les threads de fond) ; au total
+    workers × (DB_POOL_SIZE + DB_MAX_OVERFLOW) doit rester sous le
+    max_connections de PostgreSQL (100 par défaut)
+  - le pool hérité du master est abandonné après le fork (jamais de socket
+    PostgreSQL partagée entre deux process)
+  - recyclage des workers après max_requests (± jitter) pour borner les fuites
+  - GUNICORN_WORKER_CLASS=gevent (service backend-stream) : des milliers de
+    connexions inactives par worker pour le flux SSE /api/pins/stream, qui
+    immobiliserait un thread par client en gthread
+"""
+import multiprocessing
+import os
+import shutil
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", min(2 * multiprocessing.cpu_count() + 1, 5)))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+preload_app = True
+
+if worker_class == "gevent":
+    # patch avant le preload : verrous, files et sockets de l'app (bus
+    # d'invalidation, diffuseur SSE) doivent être ceux de gevent
+    from gevent import monkey
+    monkey.patch_all()
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()  # requêtes PostgreSQL non bloquantes pour les autres clients
+    except ImportError:
+        pass
+    worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG")  # "-" pour stdout
+
+# lu par app/config.py au chargement de l'app (preload, donc après ce fichier)
+os.environ.setdefault("DB_POOL_SIZE", str(threads))
+os.environ.setdefault("DB_MAX_OVERFLOW", str(max(2, threads // 2)))
+if worker_class == "sync" or (worker_class == "gthread" and threads == 1):
+    # une requête à la fois par worker : le pool de hachage (app/passwords.py)
+    # n'ajouterait qu'un saut de thread
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+# métriques Prometheus agrégées entre workers (app/metrics.py) :
+# chaque worker écrit ses compteurs dans ce dossier, vidé au démarrage.
+# Fait ici et non dans on_starting : avec preload_app l'application (et donc
+# les métriques) est chargée avant ce hook.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def post_fork(server, worker):
+    # connexions éventuellement ouvertes par le master (preload) : le worker
+    # les oublie sans les fermer, le master reste propriétaire des sockets
+    from wsgi import app
+    from app.extensions import db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    from app.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
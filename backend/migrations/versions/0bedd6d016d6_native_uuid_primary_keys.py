@@ -0,0 +1,173 @@
+"""native uuid primary and foreign keys
+
+Revision ID: 0bedd6d016d6
+Revises: 3b32b216c78b
+Create Date: 2026-10-19 14:21:09.774305
+
+Sous PostgreSQL la conversion se fait en ligne, sans réécrire les tables
+sous verrou exclusif :
+  1. colonnes fantômes *_uuid + trigger qui les tient à jour pendant la migration
+  2. backfill par lots (une transaction par lot)
+  3. CHECK (... IS NOT NULL) NOT VALID puis VALIDATE, index uniques CONCURRENTLY
+  4. bascule dans une transaction courte (lock_timeout) : contraintes
+     reposées sur les index déjà construits, FK en NOT VALID
+  5. VALIDATE des FK hors de la bascule
+Les ids restent des str côté Python (même texte canonique) : les cookies de
+session et les tokens QR qui portent `uid` restent valides.
+
+Sous SQLite (profil de test) le type générique Uuid est un CHAR(32) sans
+tirets : on convertit simplement les valeurs.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0bedd6d016d6'
+down_revision = '3b32b216c78b'
+branch_labels = None
+depends_on = None
+
+
+BATCH_SIZE = 5000
+
+# table -> colonnes converties (la première est la clé primaire)
+TABLES = {
+    'users': ['id'],
+    'membership': ['id', 'user_id'],
+    'order': ['id', 'user_id'],
+    'order_item': ['id', 'order_id'],
+}
+
+# (table, contrainte, colonne, table référencée)
+FOREIGN_KEYS = [
+    ('membership', 'membership_user_id_fkey', 'user_id', 'users'),
+    ('order', 'order_user_id_fkey', 'user_id', 'users'),
+    ('order_item', 'order_item_order_id_fkey', 'order_id', 'order'),
+]
+
+# index secondaires à reconstruire sur les colonnes uuid : (nom, table, colonnes, unique)
+SECONDARY_INDEXES = [
+    ('uq_user_annee', 'membership', ['user_id', 'annee'], True),
+    ('ix_order_user_id_created_at', 'order', ['user_id', 'created_at'], False),
+    ('ix_order_item_order_id', 'order_item', ['order_id'], False),
+]
+
+
+def _q(name):
+    return f'"{name}"'
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        _sqlite_convert(to_uuid=True)
+        return
+
+    # 1. colonnes fantômes, tenues à jour par trigger pour les écritures concurrentes
+    for table, columns in TABLES.items():
+        for col in columns:
+            op.execute(f'ALTER TABLE {_q(table)} ADD COLUMN {col}_uuid uuid')
+        assignments = ' '.join(f'NEW.{col}_uuid := NEW.{col}::uuid;' for col in columns)
+        op.execute(f"""
+            CREATE FUNCTION {table}_uuid_shadow() RETURNS trigger AS $$
+            BEGIN {assignments} RETURN NEW; END
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_uuid_shadow BEFORE INSERT OR UPDATE ON {_q(table)}
+            FOR EACH ROW EXECUTE FUNCTION {table}_uuid_shadow()
+        """)
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+
+        # 2. backfill par lots
+        for table, columns in TABLES.items():
+            sets = ', '.join(f'{col}_uuid = {col}::uuid' for col in columns)
+            stmt = sa.text(f"""
+                UPDATE {_q(table)} SET {sets}
+                WHERE ctid = ANY(ARRAY(
+                    SELECT ctid FROM {_q(table)} WHERE {columns[0]}_uuid IS NULL LIMIT {BATCH_SIZE}
+                ))
+            """)
+            while conn.execute(stmt).rowcount:
+                pass
+
+        # 3. NOT NULL prouvé par CHECK validé (SET NOT NULL n'aura pas à scanner),
+        #    index construits sans bloquer les écritures
+        for table, columns in TABLES.items():
+            for col in columns:
+                op.execute(f'ALTER TABLE {_q(table)} ADD CONSTRAINT {table}_{col}_uuid_nn '
+                           f'CHECK ({col}_uuid IS NOT NULL) NOT VALID')
+                op.execute(f'ALTER TABLE {_q(table)} VALIDATE CONSTRAINT {table}_{col}_uuid_nn')
+            op.execute(f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {table}_id_uuid_key '
+                       f'ON {_q(table)} (id_uuid)')
+        for name, table, columns, unique in SECONDARY_INDEXES:
+            cols = ', '.join(f'{c}_uuid' if c in TABLES[table] else c for c in columns)
+            op.execute(f'CREATE {"UNIQUE " if unique else ""}INDEX CONCURRENTLY IF NOT EXISTS '
+                       f'{name}_uuid ON {_q(table)} ({cols})')
+
+    # 4. bascule : uniquement des opérations sur le catalogue
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    for table in TABLES:
+        op.execute(f'DROP TRIGGER {table}_uuid_shadow ON {_q(table)}')
+        op.execute(f'DROP FUNCTION {table}_uuid_shadow()')
+    for table, name, _, _ in FOREIGN_KEYS:
+        op.execute(f'ALTER TABLE {_q(table)} DROP CONSTRAINT {name}')
+    op.execute('ALTER TABLE membership DROP CONSTRAINT uq_user_annee')
+    op.execute('DROP INDEX ix_order_user_id_created_at')
+    op.execute('DROP INDEX ix_order_item_order_id')
+    for table, columns in TABLES.items():
+        op.execute(f'ALTER TABLE {_q(table)} DROP CONSTRAINT {table}_pkey')
+        for col in columns:
+            op.execute(f'ALTER TABLE {_q(table)} DROP COLUMN {col}')
+            op.execute(f'ALTER TABLE {_q(table)} RENAME COLUMN {col}_uuid TO {col}')
+            op.execute(f'ALTER TABLE {_q(table)} ALTER COLUMN {col} SET NOT NULL')
+            op.execute(f'ALTER TABLE {_q(table)} DROP CONSTRAINT {table}_{col}_uuid_nn')
+        op.execute(f'ALTER TABLE {_q(table)} ADD CONSTRAINT {table}_pkey PRIMARY KEY USING INDEX {table}_id_uuid_key')
+    op.execute('ALTER TABLE membership ADD CONSTRAINT uq_user_annee UNIQUE USING INDEX uq_user_annee_uuid')
+    op.execute('ALTER INDEX ix_order_user_id_created_at_uuid RENAME TO ix_order_user_id_created_at')
+    op.execute('ALTER INDEX ix_order_item_order_id_uuid RENAME TO ix_order_item_order_id')
+    for table, name, col, ref in FOREIGN_KEYS:
+        op.execute(f'ALTER TABLE {_q(table)} ADD CONSTRAINT {name} FOREIGN KEY ({col}) '
+                   f'REFERENCES {_q(ref)} (id) ON DELETE CASCADE NOT VALID')
+
+    # 5. validation des FK (SHARE UPDATE EXCLUSIVE : lectures et écritures continuent)
+    with op.get_context().autocommit_block():
+        for table, name, _, _ in FOREIGN_KEYS:
+            op.execute(f'ALTER TABLE {_q(table)} VALIDATE CONSTRAINT {name}')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        _sqlite_convert(to_uuid=False)
+        return
+
+    # retour en arrière hors ligne : ALTER TYPE réécrit les tables
+    for table, name, _, _ in FOREIGN_KEYS:
+        op.execute(f'ALTER TABLE {_q(table)} DROP CONSTRAINT {name}')
+    for table, columns in TABLES.items():
+        for col in columns:
+            op.execute(f'ALTER TABLE {_q(table)} ALTER COLUMN {col} TYPE varchar USING {col}::text')
+    for table, name, col, ref in FOREIGN_KEYS:
+        op.execute(f'ALTER TABLE {_q(table)} ADD CONSTRAINT {name} FOREIGN KEY ({col}) '
+                   f'REFERENCES {_q(ref)} (id) ON DELETE CASCADE')
+
+
+def _sqlite_convert(to_uuid):
+    for table, columns in TABLES.items():
+        for col in columns:
+            if to_uuid:
+                expr = f"replace({col}, '-', '')"
+            else:
+                expr = (f"substr({col}, 1, 8) || '-' || substr({col}, 9, 4) || '-' || substr({col}, 13, 4)"
+                        f" || '-' || substr({col}, 17, 4) || '-' || substr({col}, 21)")
+            op.execute(f'UPDATE {_q(table)} SET {col} = {expr}')
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for col in columns:
+                batch_op.alter_column(
+                    col,
+                    existing_type=sa.String() if to_uuid else sa.Uuid(as_uuid=False),
+                    type_=sa.Uuid(as_uuid=False) if to_uuid else sa.String(),
+                    existing_nullable=False,
+                )
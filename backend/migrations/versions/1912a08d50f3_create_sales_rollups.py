@@ -0,0 +1,62 @@
+"""create sales_rollup and order_rollup
+
+Revision ID: 1912a08d50f3
+Revises: 0bedd6d016d6
+Create Date: 2026-10-19 15:02:41.518377
+
+Les agrégats sont remplis à partir des commandes existantes ; ensuite ils
+sont tenus à jour par l'application (app/analytics.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1912a08d50f3'
+down_revision = '0bedd6d016d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sales_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=32), nullable=False),
+    sa.Column('pin_id', sa.String(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status', 'pin_id')
+    )
+    op.create_table('order_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=32), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status')
+    )
+
+    # backfill depuis order / order_item
+    created = "coalesce(o.created_at, CURRENT_TIMESTAMP)"
+    day = f"CAST({created} AS date)" if op.get_bind().dialect.name == 'postgresql' else f"date({created})"
+    status = "coalesce(o.status, 'en attente')"
+    op.execute(f"""
+        INSERT INTO sales_rollup (day, status, pin_id, units, revenue)
+        SELECT {day}, {status}, i.pin_id,
+               sum(coalesce(i.quantity, 0)), sum(coalesce(i.quantity, 0) * i.price)
+        FROM "order" o JOIN order_item i ON i.order_id = o.id
+        GROUP BY 1, 2, 3
+    """)
+    op.execute(f"""
+        INSERT INTO order_rollup (day, status, orders, revenue)
+        SELECT {day}, {status}, count(*), coalesce(sum(t.total), 0)
+        FROM "order" o
+        LEFT JOIN (
+            SELECT order_id, sum(coalesce(quantity, 0) * price) AS total FROM order_item GROUP BY order_id
+        ) t ON t.order_id = o.id
+        GROUP BY 1, 2
+    """)
+
+
+def downgrade():
+    op.drop_table('order_rollup')
+    op.drop_table('sales_rollup')
@@ -0,0 +1,94 @@
+"""index hot lookup columns, store tokens as sha256
+
+Revision ID: 3b32b216c78b
+Revises: ae603e16d6cd
+Create Date: 2026-10-19 13:05:52.218840
+
+Index ajoutés (CONCURRENTLY sous PostgreSQL, sans bloquer les écritures) :
+  - order (user_id, created_at)  : commandes d'un membre, triées par date
+  - order (created_at)           : liste admin triée par date
+  - order_item (order_id)        : items d'une commande / jointures
+  - users (activation_token_hash), users (reset_token_hash) : uniques
+
+membership.user_id n'a pas besoin d'index dédié : la contrainte
+uq_user_annee (user_id, annee) fournit déjà un index dont user_id est la
+première colonne.
+
+Les tokens d'activation / de reset ne sont plus stockés en clair : les
+tokens en cours sont remplacés par leur sha256, les liens déjà envoyés
+restent donc valides.
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b32b216c78b'
+down_revision = 'ae603e16d6cd'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_order_user_id_created_at', 'order', ['user_id', 'created_at'], False),
+    ('ix_order_created_at', 'order', ['created_at'], False),
+    ('ix_order_item_order_id', 'order_item', ['order_id'], False),
+    ('ix_users_activation_token_hash', 'users', ['activation_token_hash'], True),
+    ('ix_users_reset_token_hash', 'users', ['reset_token_hash'], True),
+]
+
+
+def _sha256(value):
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('activation_token_hash', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('reset_token_hash', sa.String(length=64), nullable=True))
+
+    # peu de tokens en cours : backfill côté Python, valable pour tous les dialectes
+    conn = op.get_bind()
+    users = sa.table('users',
+        sa.column('id', sa.String),
+        sa.column('activation_token', sa.String),
+        sa.column('activation_token_hash', sa.String),
+        sa.column('reset_token', sa.String),
+        sa.column('reset_token_hash', sa.String),
+    )
+    rows = conn.execute(
+        sa.select(users.c.id, users.c.activation_token, users.c.reset_token)
+        .where(sa.or_(users.c.activation_token.isnot(None), users.c.reset_token.isnot(None)))
+    ).all()
+    for user_id, activation_token, reset_token in rows:
+        conn.execute(
+            users.update().where(users.c.id == user_id).values(
+                activation_token_hash=_sha256(activation_token) if activation_token else None,
+                reset_token_hash=_sha256(reset_token) if reset_token else None,
+            )
+        )
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('reset_token')
+        batch_op.drop_column('activation_token')
+
+    # CREATE INDEX CONCURRENTLY ne peut pas tourner dans une transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.create_index(name, table, columns, unique=unique,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    # les empreintes ne sont pas réversibles : les tokens en cours sont perdus
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('activation_token', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('reset_token', sa.String(length=36), nullable=True))
+        batch_op.drop_column('reset_token_hash')
+        batch_op.drop_column('activation_token_hash')
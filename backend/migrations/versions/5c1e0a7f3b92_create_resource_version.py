@@ -0,0 +1,28 @@
+"""create resource_version
+
+Revision ID: 5c1e0a7f3b92
+Revises: 1912a08d50f3
+Create Date: 2026-10-19 15:12:08.204511
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e0a7f3b92'
+down_revision = '1912a08d50f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('resource_version',
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade():
+    op.drop_table('resource_version')
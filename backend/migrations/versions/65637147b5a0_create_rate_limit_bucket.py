@@ -0,0 +1,30 @@
+"""create rate_limit_bucket
+
+Revision ID: 65637147b5a0
+Revises: fafdd343f5b2
+Create Date: 2026-10-19 10:03:41.552901
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '65637147b5a0'
+down_revision = 'fafdd343f5b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rate_limit_bucket',
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.Float(), nullable=False),
+    sa.Column('allowed', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade():
+    op.drop_table('rate_limit_bucket')
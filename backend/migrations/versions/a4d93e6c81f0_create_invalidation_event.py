@@ -0,0 +1,31 @@
+"""create invalidation_event
+
+Revision ID: a4d93e6c81f0
+Revises: 5c1e0a7f3b92
+Create Date: 2026-10-19 16:02:47.318825
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d93e6c81f0'
+down_revision = '5c1e0a7f3b92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('invalidation_event',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('channel', sa.String(length=64), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('origin', sa.String(length=128), nullable=False),
+    sa.Column('created_at', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('invalidation_event')
@@ -0,0 +1,43 @@
+"""create mailing and link mail_outbox
+
+Revision ID: ae603e16d6cd
+Revises: 99e9a8bad343
+Create Date: 2026-10-19 11:38:27.640217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ae603e16d6cd'
+down_revision = '99e9a8bad343'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('mailing',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('html', sa.Text(), nullable=False),
+    sa.Column('role', sa.String(), nullable=True),
+    sa.Column('annee', sa.Integer(), nullable=True),
+    sa.Column('recipient_count', sa.Integer(), nullable=False),
+    sa.Column('created_by', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('mail_outbox', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('mailing_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_mail_outbox_mailing_id'), ['mailing_id'], unique=False)
+        batch_op.create_foreign_key('mail_outbox_mailing_id_fkey', 'mailing', ['mailing_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    with op.batch_alter_table('mail_outbox', schema=None) as batch_op:
+        batch_op.drop_constraint('mail_outbox_mailing_id_fkey', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_mail_outbox_mailing_id'))
+        batch_op.drop_column('mailing_id')
+
+    op.drop_table('mailing')
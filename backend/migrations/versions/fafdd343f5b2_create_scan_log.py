@@ -0,0 +1,37 @@
+"""create scan_log
+
+Revision ID: fafdd343f5b2
+Revises: 841ac111fae4
+Create Date: 2026-10-19 09:12:04.118532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'fafdd343f5b2'
+down_revision = '841ac111fae4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('scan_log',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('scanned_at', sa.DateTime(), nullable=False),
+    sa.Column('valid', sa.Boolean(), nullable=False),
+    sa.Column('reason', sa.String(length=32), nullable=False),
+    sa.Column('annee', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('scan_log', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_scan_log_scanned_at'), ['scanned_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('scan_log', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_scan_log_scanned_at'))
+
+    op.drop_table('scan_log')
@@ -0,0 +1,69 @@
+"""Débit de vérification des mots de passe (logins/s par worker).
+
+Usage :
+    python scripts/bench_passwords.py                      # méthodes par défaut
+    python scripts/bench_passwords.py scrypt:16384:8:1 pbkdf2:sha256:600000 --threads 4
+
+Pour chaque méthode, mesure check_password_hash en série (worker sync) puis
+via le pool de app.passwords avec --threads threads concurrents (worker gthread).
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask
+from werkzeug.security import generate_password_hash, check_password_hash
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app import passwords  # noqa: E402
+
+DEFAULT_METHODS = ["scrypt", "scrypt:16384:8:1", "pbkdf2:sha256:600000", "pbkdf2:sha256:260000"]
+
+
+def bench(method, duration, threads):
+    pwhash = generate_password_hash("correct horse battery staple", method=method)
+
+    done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        check_password_hash(pwhash, "correct horse battery staple")
+        done += 1
+    serial = done / (time.perf_counter() - start)
+
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_METHOD=method, PASSWORD_HASH_WORKERS=threads)
+    passwords._executor = None  # nouveau pool dimensionné pour ce run
+
+    def login_loop(_):
+        n = 0
+        with app.app_context():
+            t0 = time.perf_counter()
+            while time.perf_counter() - t0 < duration:
+                passwords.verify_password(pwhash, "correct horse battery staple")
+                n += 1
+        return n
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        total = sum(pool.map(login_loop, range(threads)))
+    pooled = total / (time.perf_counter() - start)
+    return serial, pooled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("methods", nargs="*", default=DEFAULT_METHODS)
+    parser.add_argument("--duration", type=float, default=3.0, help="secondes par mesure")
+    parser.add_argument("--threads", type=int, default=4, help="threads concurrents par worker")
+    args = parser.parse_args()
+
+    print(f"{'méthode':<26} {'sync (login/s)':>15} {f'{args.threads} threads (login/s)':>22}")
+    for method in args.methods:
+        serial, pooled = bench(method, args.duration, args.threads)
+        print(f"{method:<26} {serial:>15.1f} {pooled:>22.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Budget de démarrage : temps et mémoire de `create_app()` dans un process neuf.
+
+Usage :
+    python scripts/check_startup.py                       # profil test, budgets par défaut
+    python scripts/check_startup.py --max-ms 600 --max-mb 90 --runs 7
+    python scripts/check_startup.py --profile production  # variables d'environnement de prod
+
+Chaque mesure lance un interpréteur neuf (comme un worker gunicorn recyclé
+sans preload) : import de l'application + create_app(). Le temps retenu est
+la médiane des --runs essais, la mémoire le pic RSS du process. Les modules
+lourds chargés à la demande (qrcode, PIL, alembic…) ne doivent pas être
+importés au démarrage.
+
+Code de sortie 1 si un budget est dépassé. Les budgets par défaut sont
+vérifiés par tests/test_startup.py.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(HERE, ".."))
+
+MAX_MS = 800  # médiane de create_app(), profil test
+MAX_MB = 100  # pic RSS
+
+# modules qui ne doivent être chargés qu'à la première utilisation
+LAZY_MODULES = ["qrcode", "PIL", "alembic", "flask_migrate", "dotenv"]
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+from app import create_app
+app = create_app(profile=sys.argv[1])
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "ms": elapsed * 1000,
+    "rss_mb": rss_kb / 1024,
+    "loaded": [m for m in json.loads(sys.argv[2]) if m in sys.modules],
+}))
+"""
+
+
+def measure(profile, lazy_modules):
+    out = subprocess.check_output(
+        [sys.executable, "-c", PROBE, profile, json.dumps(lazy_modules)],
+        cwd=BACKEND_DIR, text=True,
+    )
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", default="test")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=MAX_MS, help="budget de temps (médiane)")
+    parser.add_argument("--max-mb", type=float, default=MAX_MB, help="budget de mémoire (pic RSS)")
+    args = parser.parse_args()
+
+    runs = [measure(args.profile, LAZY_MODULES) for _ in range(args.runs)]
+    ms = statistics.median(r["ms"] for r in runs)
+    rss = max(r["rss_mb"] for r in runs)
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+
+    print(f"create_app ({args.profile}) : {ms:.0f} ms (médiane de {args.runs}, "
+          f"min {min(r['ms'] for r in runs):.0f}, max {max(r['ms'] for r in runs):.0f}), pic RSS {rss:.1f} Mo")
+
+    failures = []
+    if ms > args.max_ms:
+        failures.append(f"temps {ms:.0f} ms > budget {args.max_ms:.0f} ms")
+    if rss > args.max_mb:
+        failures.append(f"mémoire {rss:.1f} Mo > budget {args.max_mb:.0f} Mo")
+    if loaded:
+        failures.append(f"modules chargés au démarrage : {', '.join(loaded)}")
+    for failure in failures:
+        print(f"ÉCHEC : {failure}")
+    if not failures:
+        print("OK")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
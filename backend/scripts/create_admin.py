@@ -1,6 +1,6 @@
 from app import create_app
 from app.models import db, User, Role
-from werkzeug.security import generate_password_hash
+from app.passwords import hash_password
 
 app = create_app()
 with app.app_context():
@@ -13,7 +13,7 @@ with app.app_context():
             email=email.lower(),
             prenom="Admin",
             nom="Root",
-            password_hash=generate_password_hash("monpass"),
+            password_hash=hash_password("monpass"),
             role=Role.ADMIN,
             is_active=True  # 🔹 permet login immédiat
         )
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+from check_query_plans import check_plans  # noqa: E402
+
+# base PostgreSQL migrée (flask db upgrade) ; rien n'est écrit, tout est annulé
+DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.fixture(scope="module")
+def plans():
+    if not DATABASE_URL or not DATABASE_URL.startswith("postgresql"):
+        pytest.skip("TEST_DATABASE_URL (PostgreSQL) non défini")
+    engine = create_engine(DATABASE_URL)
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            yield {name: (plan, bad) for name, plan, bad in check_plans(conn)}
+        finally:
+            trans.rollback()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("name", [
+    "memberships d'un user",
+    "commandes d'un user",
+    "items d'une commande",
+    "items des commandes d'un user",
+    "token d'activation",
+    "token de reset",
+])
+def test_hot_query_uses_index(plans, name):
+    plan, seq_scan = plans[name]
+    assert not seq_scan, f"Seq Scan pour « {name} » : {plan['Node Type']} (coût {plan['Total Cost']})"
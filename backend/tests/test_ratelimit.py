@@ -0,0 +1,30 @@
+from sqlalchemy import select
+
+from app import create_app
+from app.extensions import db
+from app.models import RateLimitBucket
+
+
+def make_app():
+    app = create_app(profile="test", overrides={"RATELIMIT_BACKEND": "database"})
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def test_long_email_still_limited_per_account():
+    app = make_app()
+    client = app.test_client()
+    email = "a" * 300 + "@example.com"
+
+    statuses = [
+        client.post("/api/auth/login", json={"email": email, "password": "x"}).status_code
+        for _ in range(6)
+    ]
+
+    # règle "login" par compte : 5 tentatives par minute
+    assert statuses[:5] == [401] * 5
+    assert statuses[5] == 429
+    with app.app_context():
+        keys = db.session.scalars(select(RateLimitBucket.key)).all()
+    assert keys and all(len(key) <= 255 for key in keys)
@@ -0,0 +1,23 @@
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+from check_startup import LAZY_MODULES, MAX_MB, MAX_MS, measure  # noqa: E402
+
+RUNS = 3
+
+
+def test_startup_budget():
+    # chaque mesure dans un interpréteur neuf : les imports des autres tests ne comptent pas
+    runs = [measure("test", LAZY_MODULES) for _ in range(RUNS)]
+
+    ms = statistics.median(r["ms"] for r in runs)
+    rss = max(r["rss_mb"] for r in runs)
+    assert ms <= MAX_MS, f"create_app : {ms:.0f} ms > budget {MAX_MS} ms"
+    assert rss <= MAX_MB, f"pic RSS : {rss:.1f} Mo > budget {MAX_MB} Mo"
+
+
+def test_heavy_modules_stay_lazy():
+    loaded = measure("test", LAZY_MODULES)["loaded"]
+    assert not loaded, f"modules chargés au démarrage : {', '.join(loaded)}"
@@ -1,5 +1,11 @@
 import React, { useEffect, useState } from "react";
 
+type CartProblem = {
+  id?: number;
+  code: string;
+  message: string;
+};
+
 type Pin = {
   id: number;
   title: string;
@@ -13,6 +19,7 @@ const Cart: React.FC = () => {
   const [cart, setCart] = useState<Pin[]>([]);
   const [loading, setLoading] = useState(false);
   const [message, setMessage] = useState("");
+  const [problems, setProblems] = useState<CartProblem[]>([]);
   const [quantityInputs, setQuantityInputs] = useState<Record<number, string>>({});
 
 
@@ -27,9 +34,43 @@ const Cart: React.FC = () => {
         initialInputs[item.id] = item.quantity ? String(item.quantity) : "";
       });
       setQuantityInputs(initialInputs);
+      validateCart(parsed);
     }
   }, []);
 
+  // Vérifie tout le panier d'un coup (stock, prix) et reprend les prix du catalogue
+  const validateCart = async (items: Pin[]) => {
+    if (!items.length) return;
+    try {
+      const res = await fetch("/api/cart/validate", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        credentials: "include",
+        body: JSON.stringify({
+          items: items.map((item) => ({
+            id: item.id,
+            price: parseFloat(item.price),
+            quantity: item.quantity || 1,
+          })),
+        }),
+      });
+      if (!res.ok) return;
+      const j = await res.json();
+      const prices: Record<number, number> = {};
+      j.items.forEach((line: { id: number; price: number }) => {
+        prices[line.id] = line.price;
+      });
+      const updatedCart = items.map((item) =>
+        item.id in prices ? { ...item, price: String(prices[item.id]) } : item
+      );
+      setCart(updatedCart);
+      localStorage.setItem("cart", JSON.stringify(updatedCart));
+      setProblems(j.problems);
+    } catch (err) {
+      // la commande revalide de toute façon
+    }
+  };
+
   const applyQuantity = (id: number) => {
     const qty = Number(quantityInputs[id]);
     if (!qty || qty < 1) return;
@@ -70,9 +111,14 @@ const Cart: React.FC = () => {
 
       if (!res.ok) {
         const j = await res.json();
-        setMessage(j.error || `Erreur ${res.status}`);
+        if (j.problems) {
+          validateCart(cart);  // affiche tous les problèmes, prix à jour
+        } else {
+          setMessage(j.error || `Erreur ${res.status}`);
+        }
       } else {
         setMessage("Commande envoyée avec succès !");
+        setProblems([]);
         setCart([]);
         localStorage.removeItem("cart");
       }
@@ -160,6 +206,13 @@ const Cart: React.FC = () => {
       >
         {loading ? "Envoi..." : "Passer la commande"}
       </button>
+      {problems.length > 0 && (
+        <ul className="mt-2 text-red-600 list-disc">
+          {problems.map((p, index) => (
+            <li key={index}>{p.message}</li>
+          ))}
+        </ul>
+      )}
       {message && <p className="mt-2 text-red-600">{message}</p>}
     </div>
   );